@@ -0,0 +1,163 @@
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import Depends, FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from langchain_core.documents import Document
+from pydantic import BaseModel
+
+from src import metrics
+from src.auth import AuthManager
+from src.chain import ask_question, create_chain
+from src.config import Config
+from src.ingestor import IngestionPipeline
+from src.manifest import collection_version
+from src.model import create_llm, warm_up
+from src.retriever import create_retriever
+from src.uploader import upload_files
+from src.vector_store import user_documents_dir, user_store_dir
+
+app = FastAPI(title="StratLytics RAG API")
+auth_manager = AuthManager()
+bearer = HTTPBearer()
+
+# One chain per user store, built on first use and shared by every request for that store.
+_chains: Dict[str, object] = {}
+_chains_lock = threading.Lock()
+_ingest_lock = threading.Lock()
+
+
+class AskRequest(BaseModel):
+    question: str
+    session_id: Optional[str] = None
+
+
+class _NamedUpload:
+    """Adapts FastAPI's UploadFile to the name/seek/read interface upload_files expects."""
+
+    def __init__(self, upload: UploadFile):
+        self.name = Path(upload.filename or "").name
+        self._file = upload.file
+
+    def seek(self, offset: int) -> int:
+        return self._file.seek(offset)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+
+def current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer)) -> str:
+    """The user id carried by a valid session token; requests never name their user directly."""
+    user_id = auth_manager.validate_token(credentials.credentials)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token.")
+    return str(user_id)
+
+
+def get_chain(user_id: str):
+    store_dir = str(user_store_dir(user_id))
+    with _chains_lock:
+        if store_dir not in _chains:
+            llm = create_llm()
+            retriever = create_retriever(llm, persist_directory=store_dir)
+            _chains[store_dir] = create_chain(llm, retriever)
+        return _chains[store_dir]
+
+
+def _serialize_documents(documents: List[Document]) -> List[dict]:
+    return [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in documents]
+
+
+def _sse(event: str, data) -> str:
+    # Scores and other metadata may be numpy scalars, which json cannot encode on its own.
+    return f"event: {event}\ndata: {json.dumps(data, default=float)}\n\n"
+
+
+@app.on_event("startup")
+def startup():
+    if Config.Model.WARM_UP:
+        warm_up(include_llm=Config.Model.WARM_UP_LLM)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.post("/token")
+def token(username: str = Form(...), password: str = Form(...)):
+    user_id = auth_manager.authenticate_user(username, password)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid username or password.")
+    return {"access_token": auth_manager.issue_token(user_id), "token_type": "bearer"}
+
+
+@app.post("/ingest")
+async def ingest(
+    files: List[UploadFile] = File(...),
+    replace: bool = Form(False),
+    user_id: str = Depends(current_user),
+):
+    """Add the PDFs to the user's index, or with ``replace`` make them the whole document set."""
+    store_dir = user_store_dir(user_id)
+
+    def run():
+        with _ingest_lock:
+            documents = upload_files(
+                [_NamedUpload(f) for f in files],
+                documents_dir=user_documents_dir(user_id),
+            )
+            pipeline = IngestionPipeline()
+            if documents:
+                pipeline.ingest(documents, persist_directory=str(store_dir), replace=replace)
+            return documents, pipeline.failed
+
+    documents, failed = await run_in_threadpool(run)
+    ingested = [document.path.name for document in documents if document.doc_hash not in failed]
+    if not ingested:
+        raise HTTPException(status_code=422, detail="None of the uploaded files is a PDF with extractable text.")
+    return {
+        "ingested": ingested,
+        "skipped": list(failed.values()),
+        "collection_version": collection_version(store_dir),
+    }
+
+
+@app.post("/ask")
+async def ask(request: AskRequest, user_id: str = Depends(current_user)):
+    chain = await run_in_threadpool(get_chain, user_id)
+    # Sessions are namespaced by user so one user cannot read another's history.
+    session_id = f"session-{user_id}" + (f"-{request.session_id}" if request.session_id else "")
+
+    async def events():
+        try:
+            async for event in ask_question(
+                chain,
+                request.question,
+                session_id=session_id,
+                collection_version=collection_version(user_store_dir(user_id)),
+            ):
+                if isinstance(event, list):
+                    yield _sse("sources", _serialize_documents(event))
+                elif isinstance(event, str) and event:
+                    yield _sse("token", event)
+        except Exception:
+            # Headers are already sent, so the failure has to travel as an event.
+            yield _sse("error", {"detail": "Error generating response."})
+        yield _sse("done", {})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8000)
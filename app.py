@@ -103,12 +103,15 @@ async def ask_chain(question: str, chain=None):
         
         if chain:
             # Use RAG if chain exists (PDF uploaded)
-            async for event in ask_question(chain, question, session_id="session-id-42"):
-                if isinstance(event, str):
-                    full_response += event
-                    message_placeholder.markdown(full_response)
-                if isinstance(event, list):
-                    documents.extend(event)
+            try:
+                async for event in ask_question(chain, question, session_id="session-id-42"):
+                    if isinstance(event, str):
+                        full_response += event
+                        message_placeholder.markdown(full_response)
+                    if isinstance(event, list):
+                        documents.extend(event)
+            except Exception as e:
+                st.error(f"Error generating response: {str(e)}")
         else:
             # Use direct LLM if no PDFs uploaded
             llm = create_llm()
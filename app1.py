@@ -1,4 +1,6 @@
 import asyncio
+import time
+import uuid
 import streamlit as st
 from dotenv import load_dotenv
 import os
@@ -8,15 +10,34 @@ from langchain_core.messages import HumanMessage
 from src.auth import AuthManager
 from src.chain import ask_question, create_chain
 from src.config import Config
-from src.ingestor import IngestionPipeline
-from src.model import create_llm
+from src.manifest import collection_version, has_documents
+from src.metrics import start_metrics_server
+from src.model import create_llm, warm_up
 from src.retriever import create_retriever
-from src.uploader import upload_files
+from src.jobs import ingestion_jobs
+from src.uploader import stage_files
+from src.vector_store import user_documents_dir, user_store_dir
+from logger.logging import logging
 
 load_dotenv()
 
-# Initialize authentication manager
-auth_manager = AuthManager()
+# Initialize authentication manager once per process so its connection pool and token cache survive reruns
+@st.cache_resource(show_spinner=False)
+def get_auth_manager():
+    return AuthManager()
+
+auth_manager = get_auth_manager()
+
+# Load the shared models once per process before the first question arrives
+if Config.Model.WARM_UP:
+    warm_up(include_llm=Config.Model.WARM_UP_LLM)
+
+# Resume ingestion jobs interrupted by a restart
+ingestion_jobs.start()
+
+# Per-stage latency histograms for Prometheus, served from a local port
+if Config.Metrics.ENABLED:
+    start_metrics_server()
 
 def show_guide_document():
     # with st.expander("📚 How to Use StratLytics Chatbot", expanded=True):
@@ -73,56 +94,104 @@ def show_guide_document():
         st.error(f"Error accessing the guide document: {str(e)}")
 
 @st.cache_resource(show_spinner=False)
-def build_qa_chain(files, user_id):
-    user_dir = Config.Path.VECTOR_STORES_DIR / f"user_{user_id}"
-    file_paths = upload_files(files)
-    vector_store = IngestionPipeline().ingest(file_paths, persist_directory=str(user_dir))
+def get_user_chain(user_id):
+    # The retriever reads the user's store live, so batches become searchable as they land.
+    user_dir = user_store_dir(user_id)
     llm = create_llm()
-    retriever = create_retriever(llm, vector_store=vector_store)
+    retriever = create_retriever(llm, persist_directory=str(user_dir))
     return create_chain(llm, retriever)
 
-async def stream_response(text: str, message_placeholder):
-    full_response = ""
-    words = text.split(' ')
-    for i, word in enumerate(words):
-        full_response += word
-        if i < len(words) - 1:
-            full_response += " "
-        message_placeholder.markdown(full_response + "▌")
-        await asyncio.sleep(0.05)
-    return full_response
+def submit_ingestion(files, user_id):
+    upload_key = tuple((f.name, f.size) for f in files)
+    if st.session_state.get("ingest_upload_key") != upload_key:
+        staging_dir = user_documents_dir(user_id) / uuid.uuid4().hex
+        staged = stage_files(files, remove_old_files=False, documents_dir=staging_dir)
+        st.session_state.ingest_job_id = ingestion_jobs.submit(user_id, user_store_dir(user_id), staged)
+        st.session_state.ingest_upload_key = upload_key
+    return st.session_state.ingest_job_id
+
+@st.experimental_fragment(run_every=Config.UI.JOB_POLL_SECONDS)
+def show_ingestion_progress(job_id):
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        return
+    counts = f"{job.pages} pages parsed · {job.chunks} chunks embedded · {job.points} chunks searchable"
+    if job.status == "done":
+        st.success(f"✅ {len(job.files)} document(s) successfully processed!")
+        if job.error:
+            st.warning(job.error)
+    elif job.status == "failed":
+        st.error(f"Processing failed: {job.error}")
+    else:
+        st.info(f"Analyzing your document(s)... {counts} ({job.chunks_per_second:.1f} chunks/s)")
+        return
+    st.caption(counts)
+
+class RenderBuffer:
+    """Collects streamed text and re-renders the placeholder at most every interval or N characters."""
+
+    def __init__(self, placeholder):
+        self.placeholder = placeholder
+        self.text = ""
+        self.renders = 0
+        self.render_seconds = 0.0
+        self._pending_chars = 0
+        self._last_render = time.perf_counter()
+
+    def append(self, text: str):
+        self.text += text
+        self._pending_chars += len(text)
+        if (self._pending_chars >= Config.UI.RENDER_EVERY_CHARS
+                or time.perf_counter() - self._last_render >= Config.UI.RENDER_INTERVAL_SECONDS):
+            self.flush(cursor=True)
+
+    def flush(self, cursor: bool = False):
+        started = time.perf_counter()
+        self.placeholder.markdown(self.text + ("▌" if cursor else ""))
+        self._last_render = time.perf_counter()
+        self.render_seconds += self._last_render - started
+        self.renders += 1
+        self._pending_chars = 0
 
 async def ask_chain(question: str, chain=None):
-    full_response = ""
     assistant = st.chat_message(
         "assistant", avatar=str(Config.Path.IMAGES_DIR / "logo2.png")
     )
     with assistant:
         message_placeholder = st.empty()
+        buffer = RenderBuffer(message_placeholder)
         documents = []
         
         if chain:
-            async for event in ask_question(chain, question, session_id=f"session-{st.session_state.user_id}"):
-                if isinstance(event, str):
-                    full_response += event
-                    message_placeholder.markdown(full_response)
-                if isinstance(event, list):
-                    documents.extend(event)
+            try:
+                async for event in ask_question(
+                    chain,
+                    question,
+                    session_id=f"session-{st.session_state.user_id}",
+                    collection_version=collection_version(user_store_dir(st.session_state.user_id)),
+                ):
+                    if isinstance(event, str):
+                        buffer.append(event)
+                    if isinstance(event, list):
+                        documents.extend(event)
+            except Exception as e:
+                st.error(f"Error generating response: {str(e)}")
+                buffer.text = "I apologize, but I encountered an error processing your request."
         else:
-            llm = create_llm()
             try:
                 messages = [HumanMessage(content=question)]
-                response = await llm.agenerate([messages])
-                full_response = await stream_response(
-                    response.generations[0][0].text,
-                    message_placeholder
-                )
+                async for chunk in create_llm().astream(messages):
+                    buffer.append(chunk.content)
             except Exception as e:
                 st.error(f"Error generating response: {str(e)}")
-                full_response = "I apologize, but I encountered an error processing your request."
-                message_placeholder.markdown(full_response)
+                buffer.text = "I apologize, but I encountered an error processing your request."
 
-        message_placeholder.markdown(full_response)
+        buffer.flush()
+        full_response = buffer.text
+        logging.info(
+            "Rendered %d chars in %d updates, %.1f ms total.",
+            len(full_response), buffer.renders, buffer.render_seconds * 1000,
+        )
 
     st.session_state.messages.append({"role": "assistant", "content": full_response})
 
@@ -153,20 +222,34 @@ def show_upload_documents():
                 accept_multiple_files=True
             )
         
+        job_id = st.session_state.get("ingest_job_id")
         if uploaded_files and any(uploaded_files):  # Check if there are any valid files
-            with st.spinner("Analyzing your document(s)..."):
-                # Remove None values if any
-                valid_files = [f for f in uploaded_files if f is not None]
-                if valid_files:
-                    chain = build_qa_chain(valid_files, st.session_state.user_id)
-                    st.success(f"✅ {len(valid_files)} document(s) successfully processed!")
-                else:
-                    st.warning("No valid files were uploaded.")
-                    return None
+            # Remove None values if any
+            valid_files = [f for f in uploaded_files if f is not None]
+            if valid_files:
+                job_id = submit_ingestion(valid_files, st.session_state.user_id)
+            else:
+                st.warning("No valid files were uploaded.")
+                return None
+        elif job_id is None:
+            # Pick up a job that was still running when the page was refreshed.
+            latest = ingestion_jobs.latest(st.session_state.user_id)
+            if latest and not latest.done:
+                job_id = st.session_state.ingest_job_id = latest.id
+
+        chain = None
+        if job_id:
+            show_ingestion_progress(job_id)
+            job = ingestion_jobs.get(job_id)
+            if job and (job.points > 0 or job.status == "done"):
+                chain = get_user_chain(st.session_state.user_id)
+        if chain is None and has_documents(user_store_dir(st.session_state.user_id)):
+            # Documents indexed by an earlier job, e.g. before the page was refreshed.
+            chain = get_user_chain(st.session_state.user_id)
         
         st.markdown("---")
         
-        return chain if uploaded_files and any(uploaded_files) else None
+        return chain
 
 def show_message_history():
     for message in st.session_state.messages:
@@ -214,6 +297,7 @@ def show_auth_page():
             user_id = auth_manager.authenticate_user(login_username, login_password)
             if user_id:
                 st.session_state.user_id = user_id
+                st.session_state.auth_token = auth_manager.issue_token(user_id)
                 st.session_state.username = login_username
                 st.session_state.messages = [
                     {
@@ -372,7 +456,7 @@ def main():
     """,
     unsafe_allow_html=True)
 
-    if "user_id" not in st.session_state:
+    if auth_manager.validate_token(st.session_state.get("auth_token")) is None:
         show_auth_page()
     else:
         # Add logout button to top right corner
@@ -1,28 +1,32 @@
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
 from flask import Flask, request, jsonify
 from flask_restful import Resource, Api
-from src.model import create_llm
+from src.config import Config
+from src.llm_queue import GenerationTimeoutError, QueueFullError, QueueTimeoutError, generation_queue
 from langchain_core.messages import HumanMessage
 
 app = Flask(__name__)
 api = Api(app)
 
-llm = create_llm()
-# Define your chatbot logic here (synchronous version)
+# Generations run on the queue's async workers; request threads only wait for their result.
 def chatbot_response(query):
     try:
-        # Create LLM (Large Language Model)
-        
         messages = [HumanMessage(content=query)]
         
-        # Generate response synchronously (without 'await')
-        response = llm.generate([messages])
+        response = generation_queue.generate_sync(
+            messages,
+            timeout=Config.Serving.QUEUE_TIMEOUT_SECONDS + Config.Serving.GENERATION_TIMEOUT_SECONDS,
+        )
 
         # Ensure the response is available
         if response:
-            return {"status": "success", "response": response.generations[0][0].text}
+            return {"status": "success", "response": response}
         else:
             return {"status": "failure", "response": "No valid response from the model."}
     
+    except (QueueFullError, QueueTimeoutError, GenerationTimeoutError, FutureTimeoutError):
+        raise
     except Exception as e:
         return {"status": "failure", "response": str(e)}
 
@@ -37,15 +41,26 @@ class Chatbot(Resource):
         if not query:
             return {"error": "Query is required"}, 400
 
-        # Get the chatbot response
-        response = chatbot_response(query)
+        # Get the chatbot response, shedding load when the queue is saturated
+        try:
+            response = chatbot_response(query)
+        except QueueFullError as e:
+            return {"error": str(e)}, 429, {"Retry-After": "5"}
+        except (QueueTimeoutError, GenerationTimeoutError, FutureTimeoutError):
+            return {"error": "Timed out waiting for the model."}, 503
 
         # Return the response as JSON
         return {"query": query, "response": response}, 200
 
+class Stats(Resource):
+    def get(self):
+        return generation_queue.stats(), 200
+
 # Add the Chatbot resource to the API
 api.add_resource(Chatbot, '/chatbot')
+api.add_resource(Stats, '/stats')
 
 # Run the Flask app
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    generation_queue.start()
+    app.run(debug=Config.DEBUG, host='0.0.0.0', port=5000, threaded=True)
@@ -0,0 +1,216 @@
+"""Offline end-to-end benchmark for the RAG pipeline.
+
+Ingests the fixture PDFs into a throwaway store, then measures retrieval,
+reranking and time to first token through ``ask_question`` with a
+deterministic fake chat model, so no Ollama server is needed. Results are
+written as JSON for comparison across commits:
+
+    python benchmark.py --output bench-results/$(git rev-parse --short HEAD).json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from src.config import Config
+
+FIXTURES = sorted(Path("data2").rglob("*.pdf"))
+FAKE_ANSWER = (
+    "Based on the provided context, the document describes the requested topic in detail. "
+    "Please refer to the cited pages for the exact wording."
+)
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    if not samples_ms:
+        return {}
+    ordered = sorted(samples_ms)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": round(ordered[-1], 2),
+    }
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def configure(workdir: Path) -> None:
+    """Point every on-disk store at ``workdir`` and turn off the caches so each query does real work."""
+    Config.Path.DATABASE_DIR = workdir / "docs-db"
+    Config.Path.EMBEDDINGS_CACHE = workdir / "embeddings.sqlite"
+    Config.Path.SESSION_HISTORY_DB = workdir / "sessions.db"
+    Config.Path.JOBS_DB = workdir / "jobs.db"
+    Config.EmbeddingCache.ENABLED = False
+    Config.AnswerCache.ENABLED = False
+    Config.RetrievalCache.ENABLED = False
+    Config.Retriever.USE_CHAIN_FILTER = False
+
+
+def run(fixtures: List[Path], query_count: int) -> dict:
+    # Imported after configure() so module-level stores pick up the benchmark paths.
+    from langchain_core.embeddings import Embeddings
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from flashrank import RerankRequest
+
+    from src.chain import ask_question, create_chain
+    from src.ingestor import IngestionPipeline
+    from src.model import create_embeddings, create_reranker, warm_up
+    from src.retriever import create_first_stage, create_retriever, fetch_candidates
+    from src.session_history import store
+    from src.sparse_index import BM25Index
+    from src.vector_store import PooledQdrant, client_pool
+
+    class CountingEmbeddings(Embeddings):
+        def __init__(self, embeddings: Embeddings):
+            self.embeddings = embeddings
+            self.texts = 0
+
+        def embed_documents(self, texts: List[str]) -> List[List[float]]:
+            self.texts += len(texts)
+            return self.embeddings.embed_documents(texts)
+
+        def embed_query(self, text: str) -> List[float]:
+            self.texts += 1
+            return self.embeddings.embed_query(text)
+
+    warm_up()
+    embeddings = CountingEmbeddings(create_embeddings())
+    counts = {"pages": 0, "chunks": 0, "points": 0}
+
+    def progress(**increments):
+        for name, value in increments.items():
+            counts[name] += value
+
+    started = time.perf_counter()
+    IngestionPipeline(embeddings=embeddings).ingest(fixtures, progress=progress)
+    ingest_seconds = time.perf_counter() - started
+    ingest = {
+        **counts,
+        "embeddings": embeddings.texts,
+        "seconds": round(ingest_seconds, 3),
+        "pages_per_second": round(counts["pages"] / ingest_seconds, 2),
+        "chunks_per_second": round(counts["chunks"] / ingest_seconds, 2),
+        "embeddings_per_second": round(embeddings.texts / ingest_seconds, 2),
+    }
+
+    # Queries are the opening words of indexed chunks, so every one has a known answer in the store.
+    database_dir = Config.Path.DATABASE_DIR
+    chunks = BM25Index.for_directory(database_dir).sample_chunks(query_count)
+    queries = [" ".join(content.split()[:12]) for content in chunks if content.strip()]
+
+    vector_store = PooledQdrant(database_dir, embeddings=create_embeddings())
+    first_stage = create_first_stage(vector_store, database_dir)
+    reranker = create_reranker()
+    embed_ms, fetch_ms, rerank_ms = [], [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        vector = create_embeddings().embed_query(query)
+        t1 = time.perf_counter()
+        # Reuse the vector so first_stage times only the searches, not a second embedding.
+        candidates = fetch_candidates(first_stage, query, Config.Retriever.FETCH_K, vector)
+        t2 = time.perf_counter()
+        if candidates:
+            passages = [{"id": i, "text": doc.page_content} for i, doc in enumerate(candidates)]
+            reranker.client.rerank(RerankRequest(query=query, passages=passages))
+            rerank_ms.append((time.perf_counter() - t2) * 1000)
+        embed_ms.append((t1 - t0) * 1000)
+        fetch_ms.append((t2 - t1) * 1000)
+
+    llm = FakeListChatModel(responses=[FAKE_ANSWER])
+    chain = create_chain(llm, create_retriever(llm, vector_store=vector_store))
+
+    async def answer(query: str, session_id: str):
+        started = time.perf_counter()
+        first_token = None
+        async for chunk in ask_question(chain, query, session_id):
+            if isinstance(chunk, str) and first_token is None:
+                first_token = time.perf_counter()
+        finished = time.perf_counter()
+        return (first_token or finished) - started, finished - started
+
+    ttft_ms, total_ms = [], []
+    for i, query in enumerate(queries):
+        ttft, total = asyncio.run(answer(query, f"benchmark-{i}"))
+        ttft_ms.append(ttft * 1000)
+        total_ms.append(total * 1000)
+
+    store.flush()
+    client_pool.close_all()
+
+    return {
+        "ingest": ingest,
+        "latency_ms": {
+            "embed_query": percentiles(embed_ms),
+            "first_stage": percentiles(fetch_ms),
+            "rerank": percentiles(rerank_ms),
+            "time_to_first_token": percentiles(ttft_ms),
+            "answer_total": percentiles(total_ms),
+        },
+        "queries": len(queries),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the RAG pipeline.")
+    parser.add_argument("--output", type=Path, default=Path("bench-results") / f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    parser.add_argument("--queries", type=int, default=50, help="Number of retrieval/answer queries to time.")
+    parser.add_argument("pdfs", nargs="*", type=Path, default=FIXTURES, help="PDFs to ingest (default: data2/**/*.pdf).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as workdir:
+        configure(Path(workdir))
+        results = run(args.pdfs, args.queries)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fixtures": [str(p) for p in args.pdfs],
+        "config": {
+            "embeddings": Config.Model.EMBEDDINGS,
+            "reranker": Config.Model.RERANKER,
+            "search_type": Config.Retriever.SEARCH_TYPE,
+            "fetch_k": Config.Retriever.FETCH_K,
+            "top_n": Config.Retriever.TOP_N,
+            "chunk_embeddings": Config.Ingestion.CHUNK_EMBEDDINGS,
+            "batch_size": Config.Ingestion.BATCH_SIZE,
+        },
+        **results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
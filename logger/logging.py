@@ -1,16 +1,133 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import random
+import zlib
+from datetime import datetime, timezone
 
-LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
+from src.config import Config
 
-log_path = os.path.join(os.getcwd(),"logs")
+# Set per request with set_log_context(); each asyncio task gets its own copy.
+request_id_var = contextvars.ContextVar("request_id", default=None)
+session_id_var = contextvars.ContextVar("session_id", default=None)
 
-os.makedirs(log_path,exist_ok=True)
+os.makedirs(Config.Logging.DIR, exist_ok=True)
 
-LOG_FILEPATH = os.path.join(log_path, LOG_FILE)
 
-logging.basicConfig(level=logging.INFO,
-                    filename=LOG_FILEPATH,
-                    format = "[%(asctime)s] %(lineno)d %(name)s - %(levelname)s - %(message)s"
-)
\ No newline at end of file
+def _log_filepath():
+    name = Config.Logging.FILE.format(time=datetime.now().strftime("%m_%d_%Y_%H_%M_%S"), pid=os.getpid())
+    return os.path.join(Config.Logging.DIR, name)
+
+
+LOG_FILEPATH = _log_filepath()
+
+
+def set_log_context(request_id=None, session_id=None):
+    """Tag later records from the current asyncio task or thread with these IDs."""
+    request_id_var.set(request_id)
+    session_id_var.set(session_id)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps request/session IDs and drops sampled-out INFO records before they are queued."""
+
+    def __init__(self, sample_rates):
+        super().__init__()
+        self.sample_rates = sample_rates
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        record.session_id = session_id_var.get()
+        rate = self.sample_rates.get(record.module, 1.0)
+        if rate >= 1.0 or record.levelno > logging.INFO:
+            return True
+        if record.request_id:
+            # Keep or drop every record of a request together so sampled traces stay complete.
+            return zlib.crc32(str(record.request_id).encode()) % 10_000 < rate * 10_000
+        return random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "session_id", None):
+            entry["session_id"] = record.session_id
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: when the writer falls behind, records are counted and dropped."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message and traceback now (args may not be picklable or stable),
+        # but leave the JSON layout to the writer thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+def _file_handler(filepath):
+    handler = logging.handlers.RotatingFileHandler(
+        filepath, maxBytes=Config.Logging.MAX_BYTES,
+        backupCount=Config.Logging.BACKUP_COUNT, encoding="utf-8", delay=True,
+    )
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def _configure():
+    root = logging.getLogger()
+    root.setLevel(Config.Logging.LEVEL)
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=Config.Logging.QUEUE_SIZE))
+    queue_handler.addFilter(ContextFilter(Config.Logging.SAMPLE_RATES))
+    root.addHandler(queue_handler)
+
+    # The listener thread does all file I/O; request threads and the event loop only enqueue.
+    listener = logging.handlers.QueueListener(queue_handler.queue, _file_handler(LOG_FILEPATH), respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    def _after_fork_in_child():
+        # Forked workers (e.g. PDF parsing) have no listener thread; they write directly
+        # to a file of their own, so no two processes ever rotate the same file.
+        root.removeHandler(queue_handler)
+        handler = _file_handler(_log_filepath())
+        handler.addFilter(ContextFilter(Config.Logging.SAMPLE_RATES))
+        root.addHandler(handler)
+
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+_configure()
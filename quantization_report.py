@@ -0,0 +1,137 @@
+"""Memory saved against recall@k for each vector quantization mode.
+
+Reads the vectors of an existing documents collection, embeds a sample of
+queries taken from the indexed chunks, and compares exact float32 search
+with simulated int8 scalar and binary quantization, with and without
+full-precision rescoring of the oversampled candidates:
+
+    python quantization_report.py --store vector-stores/user_1 --k 5 --output quantization.json
+
+The quantizers mirror Qdrant's (quantile-clipped int8, sign bits), so the
+numbers carry over to a Qdrant server with Config.Database.QUANTIZATION set.
+"""
+import argparse
+import json
+import math
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from src.config import Config
+from src.model import create_embeddings
+from src.sparse_index import BM25Index
+from src.vector_store import client_pool
+
+
+def load_vectors(store_dir: Path) -> np.ndarray:
+    client = client_pool.get(store_dir)
+    vectors, offset = [], None
+    while True:
+        points, offset = client.scroll(
+            Config.Database.DOCUMENTS_COLLECTION, limit=1000, offset=offset, with_vectors=True, with_payload=False
+        )
+        vectors.extend(point.vector for point in points)
+        if offset is None:
+            break
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def sample_queries(store_dir: Path, count: int) -> List[str]:
+    chunks = BM25Index.for_directory(store_dir).sample_chunks(count, shuffle=True)
+    return [" ".join(content.split()[:12]) for content in chunks if content.strip()]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def scalar_scores(vectors: np.ndarray, queries: np.ndarray, quantile: float) -> np.ndarray:
+    low, high = np.quantile(vectors, [1 - quantile, quantile])
+    scale = (high - low) / 255
+    codes = np.round((np.clip(vectors, low, high) - low) / scale).astype(np.uint8)
+    return queries @ (codes.astype(np.float32) * scale + low).T
+
+
+def binary_scores(vectors: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    return np.sign(queries) @ np.sign(vectors).T
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, scores.shape[1])
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, candidates, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def recall(found: np.ndarray, exact: np.ndarray) -> float:
+    hits = [len(set(f) & set(e)) / len(e) for f, e in zip(found, exact)]
+    return round(float(np.mean(hits)), 4)
+
+
+def evaluate(vectors: np.ndarray, queries: np.ndarray, k: int, oversampling: float) -> Dict[str, dict]:
+    exact_scores = queries @ vectors.T
+    exact = top_k(exact_scores, k)
+    count, dimensions = vectors.shape
+    full_bytes = count * dimensions * 4
+
+    report = {"none": {"index_bytes": full_bytes, "memory_saved": 0.0, "recall": 1.0, "recall_rescored": 1.0}}
+    approximations = {
+        "scalar": (scalar_scores(vectors, queries, Config.Database.QUANTIZATION_QUANTILE), count * dimensions),
+        "binary": (binary_scores(vectors, queries), count * math.ceil(dimensions / 8)),
+    }
+    for mode, (scores, index_bytes) in approximations.items():
+        candidates = top_k(scores, math.ceil(k * oversampling))
+        rescored = np.take_along_axis(exact_scores, candidates, axis=1).argsort(axis=1)[:, ::-1][:, :k]
+        report[mode] = {
+            "index_bytes": index_bytes,
+            "memory_saved": round(1 - index_bytes / full_bytes, 4),
+            "recall": recall(top_k(scores, k), exact),
+            "recall_rescored": recall(np.take_along_axis(candidates, rescored, axis=1), exact),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare vector quantization modes on an existing store.")
+    parser.add_argument("--store", type=Path, default=Config.Path.DATABASE_DIR)
+    parser.add_argument("--k", type=int, default=Config.Retriever.FETCH_K)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--oversampling", type=float, default=Config.Database.RESCORE_OVERSAMPLING)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.store)
+    queries = sample_queries(args.store, args.queries)
+    if not len(vectors) or not queries:
+        raise SystemExit(f"No indexed chunks found in {args.store}.")
+    vectors = normalize(vectors)
+    # Queries get the model's query instruction, as at search time; passages were embedded without it.
+    embeddings = create_embeddings()
+    query_vectors = normalize(np.asarray([embeddings.embed_query(query) for query in queries], dtype=np.float32))
+
+    report = {
+        "store": str(args.store),
+        "points": len(vectors),
+        "dimensions": vectors.shape[1],
+        "queries": len(queries),
+        "k": args.k,
+        "oversampling": args.oversampling,
+        "modes": evaluate(vectors, query_vectors, args.k, args.oversampling),
+    }
+
+    # Rescoring needs the full vectors too; Qdrant can keep them on disk (on_disk=True) so RAM holds only the index.
+    print(f"{report['points']} points x {report['dimensions']} dims, {report['queries']} queries, recall@{args.k}")
+    print(f"{'mode':<8}{'RAM index':>14}{'saved':>8}{'recall':>9}{'rescored':>10}")
+    for mode, row in report["modes"].items():
+        print(f"{mode:<8}{row['index_bytes'] / 2**20:>11.2f} MB{row['memory_saved']:>8.0%}"
+              f"{row['recall']:>9.3f}{row['recall_rescored']:>10.3f}")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
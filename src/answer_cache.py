@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.config import Config
+from logger.logging import logging
+
+
+@dataclass
+class CachedAnswer:
+    collection_version: str
+    question: str
+    vector: np.ndarray
+    answer: str
+    documents: List[Document]
+    created: float = field(default_factory=time.monotonic)
+
+
+class SemanticAnswerCache:
+    """LRU/TTL cache of final answers, matched by cosine similarity of question embeddings.
+
+    Entries are scoped to a collection version, so an answer is only reused while
+    the indexed document set it was generated from is unchanged.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1)
+
+    def lookup(self, collection_version: str, vector: List[float]) -> Optional[CachedAnswer]:
+        query = self._normalize(vector)
+        now = time.monotonic()
+        with self._lock:
+            for entry_id in [i for i, e in self._entries.items() if now - e.created > self.ttl_seconds]:
+                del self._entries[entry_id]
+
+            candidates = [(i, e) for i, e in self._entries.items() if e.collection_version == collection_version]
+            if candidates:
+                similarities = np.stack([e.vector for _, e in candidates]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry_id, entry = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    logging.info("Answer cache hit (similarity %.3f).", similarities[best])
+                    return entry
+            self.misses += 1
+            return None
+
+    def store(self, collection_version: str, question: str, vector: List[float],
+              answer: str, documents: List[Document]) -> None:
+        with self._lock:
+            self._entries[self._next_id] = CachedAnswer(
+                collection_version, question, self._normalize(vector), answer, documents
+            )
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, collection_version: Optional[str] = None) -> None:
+        """Drop every entry for a collection version, or all entries when none is given."""
+        with self._lock:
+            for entry_id in [i for i, e in self._entries.items()
+                             if collection_version is None or e.collection_version == collection_version]:
+                del self._entries[entry_id]
+
+
+answer_cache = SemanticAnswerCache(
+    threshold=Config.AnswerCache.SIMILARITY_THRESHOLD,
+    ttl_seconds=Config.AnswerCache.TTL_SECONDS,
+    max_entries=Config.AnswerCache.MAX_ENTRIES,
+)
@@ -1,45 +1,160 @@
+import os
 import sqlite3
 import hashlib
+import hmac
+import queue
+import secrets
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
+from src.config import Config
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version).
+# A (table, column, definition) entry adds a column unless the table already has it.
+MIGRATIONS = [
+    '''CREATE TABLE IF NOT EXISTS users
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL)''',
+    ("users", "token_version", "INTEGER NOT NULL DEFAULT 0"),
+    '''CREATE TABLE IF NOT EXISTS settings
+       (key TEXT PRIMARY KEY,
+        value TEXT NOT NULL)''',
+    # The token secret no longer lives in the database file.
+    "DROP TABLE IF EXISTS settings",
+]
+
 class AuthManager:
-    def __init__(self, db_path="users.db"):
+    def __init__(self, db_path="users.db", pool_size=None):
         self.db_path = db_path
+        self._pool = queue.Queue()
+        for _ in range(pool_size or Config.Auth.POOL_SIZE):
+            self._pool.put(self._connect())
+        self._token_cache = {}
+        self._token_cache_lock = threading.Lock()
         self._init_db()
+        self._secret = self._load_secret()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
 
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS users
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      username TEXT UNIQUE NOT NULL,
-                      password TEXT NOT NULL)''')
-        conn.commit()
-        conn.close()
+        with self._connection() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for statement in MIGRATIONS[version:]:
+                if isinstance(statement, tuple):
+                    # Databases created before migrations were tracked may already be partly up to date.
+                    table, column, definition = statement
+                    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+                    if column in columns:
+                        continue
+                    statement = f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+            conn.commit()
+
+    @staticmethod
+    def _load_secret():
+        """AUTH_SECRET_KEY, or a random secret kept in an untracked file shared by all workers."""
+        if Config.Auth.SECRET_KEY:
+            return Config.Auth.SECRET_KEY.encode()
+        secret_file = Path(Config.Path.AUTH_SECRET_FILE)
+        if not secret_file.exists():
+            # Written aside and linked into place, so a concurrent worker never reads a partial file.
+            fd, tmp_path = tempfile.mkstemp(dir=secret_file.parent)
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.write(secrets.token_hex(32))
+                os.link(tmp_path, secret_file)
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(tmp_path)
+        return secret_file.read_text().strip().encode()
 
     def _hash_password(self, password):
         return hashlib.sha256(password.encode()).hexdigest()
 
     def register_user(self, username, password):
-        try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            hashed_pwd = self._hash_password(password)
-            c.execute("INSERT INTO users (username, password) VALUES (?, ?)",
-                     (username, hashed_pwd))
-            conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
-        finally:
-            conn.close()
+        with self._connection() as conn:
+            try:
+                hashed_pwd = self._hash_password(password)
+                conn.execute("INSERT INTO users (username, password) VALUES (?, ?)",
+                             (username, hashed_pwd))
+                conn.commit()
+                return True
+            except sqlite3.IntegrityError:
+                conn.rollback()
+                return False
 
     def authenticate_user(self, username, password):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        hashed_pwd = self._hash_password(password)
-        c.execute("SELECT id FROM users WHERE username=? AND password=?",
-                 (username, hashed_pwd))
-        user = c.fetchone()
-        conn.close()
-        return user[0] if user else None
\ No newline at end of file
+        with self._connection() as conn:
+            hashed_pwd = self._hash_password(password)
+            user = conn.execute("SELECT id FROM users WHERE username=? AND password=?",
+                                (username, hashed_pwd)).fetchone()
+        return user[0] if user else None
+
+    def _sign(self, payload):
+        return hmac.new(self._secret, payload.encode(), hashlib.sha256).hexdigest()
+
+    def issue_token(self, user_id):
+        """Create a signed session token for a user, valid for Config.Auth.TOKEN_TTL_SECONDS."""
+        with self._connection() as conn:
+            token_version = conn.execute(
+                "SELECT token_version FROM users WHERE id=?", (user_id,)
+            ).fetchone()[0]
+        payload = f"{user_id}.{token_version}.{int(time.time()) + Config.Auth.TOKEN_TTL_SECONDS}"
+        return f"{payload}.{self._sign(payload)}"
+
+    def validate_token(self, token):
+        """Return the user id for a valid token; cached tokens are checked without touching the database."""
+        now = time.time()
+        with self._token_cache_lock:
+            cached = self._token_cache.get(token)
+        if cached and cached[1] > now:
+            return cached[0]
+
+        try:
+            user_id, token_version, expires, signature = token.split(".")
+            user_id, token_version, expires = int(user_id), int(token_version), int(expires)
+        except (AttributeError, ValueError):
+            return None
+        if expires <= now or not hmac.compare_digest(
+            signature, self._sign(f"{user_id}.{token_version}.{expires}")
+        ):
+            return None
+
+        with self._connection() as conn:
+            row = conn.execute("SELECT token_version FROM users WHERE id=?", (user_id,)).fetchone()
+        if not row or row[0] != token_version:
+            return None
+
+        with self._token_cache_lock:
+            if len(self._token_cache) >= Config.Auth.TOKEN_CACHE_SIZE:
+                self._token_cache = {t: v for t, v in self._token_cache.items() if v[1] > now}
+                if len(self._token_cache) >= Config.Auth.TOKEN_CACHE_SIZE:
+                    self._token_cache.clear()
+            self._token_cache[token] = (user_id, min(expires, now + Config.Auth.TOKEN_CACHE_SECONDS))
+        return user_id
+
+    def revoke_tokens(self, user_id):
+        """Invalidate every token issued to a user so far."""
+        with self._connection() as conn:
+            conn.execute("UPDATE users SET token_version = token_version + 1 WHERE id=?", (user_id,))
+            conn.commit()
+        with self._token_cache_lock:
+            self._token_cache = {t: v for t, v in self._token_cache.items() if v[0] != user_id}
@@ -1,6 +1,10 @@
+import math
 import re
+import time
+import uuid
+from dataclasses import dataclass
 from operator import itemgetter
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from langchain.schema.runnable import RunnablePassthrough
 from langchain_core.documents import Document
@@ -11,10 +15,14 @@ from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.tracers.stdout import ConsoleCallbackHandler
 from langchain_core.vectorstores import VectorStoreRetriever
 
+from src import metrics
+from src.answer_cache import answer_cache
 from src.config import Config
+from src.model import create_embeddings
+from src.retriever import run_off_loop
 from src.session_history import get_session_history
 
-from logger.logging import logging
+from logger.logging import logging, set_log_context
 
 # SYSTEM_PROMPT = """
 # Utilize the provided contextual information to respond to the user question. If the answer is not found within the context, state that the answer cannot be found. Prioritize concise responsed (maximum of 3 sentences) and use a list where applicable. The contextual information is organized with the most relevant source appearing first. Each source is seperated by a horizontal rule (----).
@@ -71,13 +79,103 @@ def remove_links(text: str) -> str:
     return re.sub(url_pattern, "", text)
 
 
-def format_documents(documents: List[Document]) -> str:
+@dataclass
+class PackedContext:
+    text: str
+    tokens: int
+    documents: List[Document]
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / Config.Context.CHARS_PER_TOKEN)
+
+
+def _overlap(previous: Document, following: Document) -> int:
+    """Characters of ``previous`` that the splitter repeated at the start of ``following``.
+
+    The size comes from the chunks' ``start_index`` offsets and must also match the
+    text: chunks from different semantic groups or page windows restart their offsets
+    and share no text, so they are never trimmed.
+    """
+    previous_start = previous.metadata.get("start_index")
+    following_start = following.metadata.get("start_index")
+    if previous_start is None or following_start is None:
+        return 0
+    size = previous_start + len(previous.page_content) - following_start
+    limit = min(len(previous.page_content), len(following.page_content), Config.Context.MAX_OVERLAP_CHARS)
+    if size <= 0 or size > limit:
+        return 0
+    return size if previous.page_content.endswith(following.page_content[:size]) else 0
+
+
+def _merge_adjacent(passage: str, previous: Document, following: Document) -> str:
+    """Append ``following`` to a passage ending in ``previous``, dropping the text the splitter repeated as overlap."""
+    size = _overlap(previous, following)
+    if size:
+        return passage + following.page_content[size:]
+    return passage + " " + following.page_content
+
+
+def _render(documents: List[Document]) -> str:
+    # Chunks from the same document with consecutive chunk indexes become one passage;
+    # passages keep the relevance rank of their best chunk.
+    groups: Dict[Tuple[str, int], int] = {}
+    passages: List[List] = []
+    for rank, doc in sorted(
+        enumerate(documents),
+        key=lambda item: (item[1].metadata.get("doc_hash", ""), item[1].metadata.get("chunk_index", -1)),
+    ):
+        source = doc.metadata.get("doc_hash")
+        index = doc.metadata.get("chunk_index")
+        previous = groups.get((source, index - 1)) if source and index is not None else None
+        if previous is not None:
+            passage = passages[previous]
+            passage[0] = min(passage[0], rank)
+            passage[1] = _merge_adjacent(passage[1], passage[2], doc)
+            passage[2] = doc
+            groups[(source, index)] = previous
+        else:
+            passages.append([rank, doc.page_content, doc])
+            if source and index is not None:
+                groups[(source, index)] = len(passages) - 1
+
     texts = []
-    for doc in documents:
-        texts.append(doc.page_content)
+    for _, text, _ in sorted(passages, key=lambda passage: passage[0]):
+        texts.append(remove_links(text))
         texts.append("----")
+    return "\n".join(texts)
+
+
+def pack_context(documents: List[Document], token_budget: Optional[int] = None) -> PackedContext:
+    """Fill the token budget with chunks in relevance order, merging neighbours and overlaps."""
+    token_budget = token_budget or Config.Context.TOKEN_BUDGET
+    selected, seen = [], set()
+    text, tokens = "", 0
+    for doc in documents:
+        key = doc.metadata.get("_id") or doc.page_content
+        if key in seen:
+            continue
+        candidate_text = _render(selected + [doc])
+        candidate_tokens = estimate_tokens(candidate_text)
+        if candidate_tokens > token_budget:
+            continue
+        seen.add(key)
+        selected.append(doc)
+        text, tokens = candidate_text, candidate_tokens
+
+    logging.info(
+        "Packed %d of %d chunks into ~%d context tokens (budget %d).",
+        len(selected), len(documents), tokens, token_budget,
+    )
+    return PackedContext(text=text, tokens=tokens, documents=selected)
 
-    return remove_links("\n".join(texts))
+
+def format_documents(documents: List[Document]) -> str:
+    with metrics.prompt_build_seconds.time():
+        packed = pack_context(documents)
+    metrics.context_chunks.observe(len(packed.documents))
+    metrics.context_tokens.observe(packed.tokens)
+    return packed.text
 
 
 def create_chain(llm: BaseLanguageModel, retriever: VectorStoreRetriever) -> Runnable:
@@ -109,12 +207,38 @@ def create_chain(llm: BaseLanguageModel, retriever: VectorStoreRetriever) -> Run
             history_messages_key="chat_history",
         ).with_config({"run_name": "chain_answer"})
     except Exception as e:
-        logging.error(f"Error creating chain: {e}")
+        logging.error("Error creating chain: %s", e)
         return None
 
-async def ask_question(chain: Runnable, question: str, session_id: str):
-    logging.info(f"Starting to ask question: {question}")
+async def ask_question(chain: Runnable, question: str, session_id: str, collection_version: Optional[str] = None):
+    set_log_context(request_id=uuid.uuid4().hex[:12], session_id=session_id)
+    # The question itself is user content; only its size goes to the log.
+    logging.info("Starting to ask question (%d chars).", len(question))
+    use_cache = Config.AnswerCache.ENABLED and collection_version is not None
+    metrics.questions_total.inc()
+    started = time.perf_counter()
+    retriever_started = first_token = None
     try:
+        if use_cache:
+            # A follow-up is answered in the context of earlier turns, so the same words
+            # can need a different answer; only opening questions use the cache.
+            history = await run_off_loop(get_session_history, session_id)
+            use_cache = not history.messages
+        if use_cache:
+            embedding_started = time.perf_counter()
+            question_vector = await run_off_loop(create_embeddings().embed_query, question)
+            metrics.query_embedding_seconds.observe(time.perf_counter() - embedding_started)
+            cached = answer_cache.lookup(collection_version, question_vector)
+            if cached:
+                metrics.answer_cache_hits_total.inc()
+                history.add_user_message(question)
+                history.add_ai_message(cached.answer)
+                yield cached.documents
+                yield cached.answer
+                logging.info("Served answer from cache.")
+                return
+
+        documents, answer_parts = [], []
         async for event in chain.astream_events(
             {"question": question},
             config={
@@ -128,15 +252,36 @@ async def ask_question(chain: Runnable, question: str, session_id: str):
                 
             if event_type == "on_retriever_start":
                 logging.info("Fetching response from vectorstore.")
+                retriever_started = time.perf_counter()
 
             if event_type == "on_retriever_end":
                 logging.info("Retriever has finished.")
-                yield event["data"]["output"]
+                documents = event["data"]["output"]
+                if retriever_started is not None:
+                    metrics.retrieval_seconds.observe(time.perf_counter() - retriever_started)
+                metrics.retrieved_chunks.observe(len(documents))
+                yield documents
                 
             if event_type == "on_chain_stream":
                 # logging.info("Streaming from chain.")
-                yield event["data"]["chunk"].content
+                if first_token is None:
+                    first_token = time.perf_counter()
+                    metrics.time_to_first_token_seconds.observe(first_token - started)
+                answer_parts.append(event["data"]["chunk"].content)
+                yield answer_parts[-1]
+
+        if first_token is not None:
+            finished = time.perf_counter()
+            metrics.answer_seconds.observe(finished - started)
+            if len(answer_parts) > 1 and finished > first_token:
+                # Ollama streams roughly one token per chunk.
+                metrics.tokens_per_second.observe((len(answer_parts) - 1) / (finished - first_token))
+
+        if use_cache and answer_parts:
+            answer_cache.store(collection_version, question, question_vector, "".join(answer_parts), documents)
         logging.info("Completed asking question.")
     except Exception as e:
-        logging.error(f"Error during ask_question: {e}")
+        metrics.question_errors_total.inc()
+        logging.exception("Error during ask_question: %s", e)
+        raise
         
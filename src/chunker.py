@@ -0,0 +1,106 @@
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from logger.logging import logging
+
+# Chunk embedding modes (Config.Ingestion.CHUNK_EMBEDDINGS):
+#   "reembed" - SemanticChunker, then embed every final chunk with the model
+#   "pooled"  - mean-pool the sentence embeddings computed while finding breakpoints
+#   "aligned" - pool chunks that start and end on sentence boundaries, re-embed the rest
+CHUNK_EMBEDDING_MODES = ("reembed", "pooled", "aligned")
+
+
+class SentenceEmbeddingChunker:
+    """Semantic chunking that keeps the sentence embeddings it computes.
+
+    Breakpoints follow langchain's SemanticChunker with the interquartile threshold;
+    the resulting groups are then split to size like the RecursiveCharacterTextSplitter
+    pass in IngestionPipeline. Each chunk is returned together with a vector pooled from
+    the sentences it covers, or None when the mode asks for it to be embedded again.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        recursive_splitter: RecursiveCharacterTextSplitter,
+        mode: str = "pooled",
+        buffer_size: int = 1,
+        breakpoint_threshold_amount: float = 1.5,
+        sentence_split_regex: str = r"(?<=[.?!])\s+",
+    ):
+        if mode not in CHUNK_EMBEDDING_MODES[1:]:
+            raise ValueError(f"Unknown chunk embedding mode '{mode}'.")
+        self.embeddings = embeddings
+        self.recursive_splitter = recursive_splitter
+        self.mode = mode
+        self.buffer_size = buffer_size
+        self.breakpoint_threshold_amount = breakpoint_threshold_amount
+        self.sentence_split_regex = sentence_split_regex
+
+    def _sentence_embeddings(self, sentences: List[str]) -> np.ndarray:
+        combined = []
+        for i in range(len(sentences)):
+            window = sentences[max(0, i - self.buffer_size): i + 1 + self.buffer_size]
+            combined.append(" ".join(window))
+        vectors = np.asarray(self.embeddings.embed_documents(combined), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _groups(self, sentences: List[str], vectors: np.ndarray) -> List[List[int]]:
+        distances = 1 - np.sum(vectors[:-1] * vectors[1:], axis=1)
+        q1, q3 = np.percentile(distances, [25, 75])
+        threshold = np.mean(distances) + self.breakpoint_threshold_amount * (q3 - q1)
+
+        groups, start = [], 0
+        for index in np.nonzero(distances > threshold)[0]:
+            groups.append(list(range(start, index + 1)))
+            start = index + 1
+        if start < len(sentences):
+            groups.append(list(range(start, len(sentences))))
+        return groups
+
+    def _pool(self, chunk: Document, spans: List[Tuple[int, int]], indices: List[int], vectors: np.ndarray) -> Optional[List[float]]:
+        chunk_start = chunk.metadata.get("start_index", -1)
+        if chunk_start < 0:
+            return None
+        chunk_end = chunk_start + len(chunk.page_content)
+        covered = [i for i, (start, end) in zip(indices, spans) if start < chunk_end and end > chunk_start]
+        if not covered:
+            return None
+        if self.mode == "aligned":
+            starts = {start for start, _ in spans}
+            ends = {end for _, end in spans}
+            if chunk_start not in starts or chunk_end not in ends:
+                return None
+        pooled = vectors[covered].mean(axis=0)
+        return (pooled / (np.linalg.norm(pooled) or 1)).tolist()
+
+    def split(self, text: str, metadata: dict) -> Tuple[List[Document], List[Optional[List[float]]]]:
+        sentences = re.split(self.sentence_split_regex, text)
+        if len(sentences) == 1:
+            chunks = self.recursive_splitter.create_documents([text], metadatas=[metadata])
+            return chunks, [None] * len(chunks)
+
+        vectors = self._sentence_embeddings(sentences)
+        chunks, chunk_vectors = [], []
+        for indices in self._groups(sentences, vectors):
+            spans, offset = [], 0
+            for i in indices:
+                spans.append((offset, offset + len(sentences[i])))
+                offset += len(sentences[i]) + 1
+            group_text = " ".join(sentences[i] for i in indices)
+
+            for chunk in self.recursive_splitter.create_documents([group_text], metadatas=[dict(metadata)]):
+                chunks.append(chunk)
+                chunk_vectors.append(self._pool(chunk, spans, indices, vectors))
+
+        logging.info(
+            "Split %d sentences into %d chunks; %d chunk vectors reused from sentence embeddings.",
+            len(sentences), len(chunks), sum(v is not None for v in chunk_vectors),
+        )
+        return chunks, chunk_vectors
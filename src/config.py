@@ -9,9 +9,24 @@ class Config:
         DOCUMENTS_DIR = APP_HOME / "tmp"
         IMAGES_DIR = APP_HOME / "images"
         VECTOR_STORES_DIR = APP_HOME / "vector-stores"
+        EMBEDDINGS_CACHE = APP_HOME / "cache" / "embeddings.sqlite"
+        SESSION_HISTORY_DB = APP_HOME / "sessions.db"
+        JOBS_DB = APP_HOME / "jobs.db"
+        AUTH_SECRET_FILE = APP_HOME / ".auth_secret"
 
     class Database:
         DOCUMENTS_COLLECTION = "documents"
+        MANIFEST_FILE = "manifest.json"
+        MAX_OPEN_CLIENTS = 16
+        CLIENT_IDLE_SECONDS = 15 * 60
+        SPARSE_INDEX_FILE = "bm25.sqlite"
+        # "none", "scalar" (int8) or "binary". Applied by a Qdrant server; the embedded local
+        # client always searches full vectors. See quantization_report.py for memory vs recall.
+        QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+        QUANTIZATION_QUANTILE = 0.99
+        QUANTIZATION_ALWAYS_RAM = True
+        # Quantized candidates fetched per requested result, then rescored with full vectors
+        RESCORE_OVERSAMPLING = 2.0
 
     class Model:
         EMBEDDINGS = "BAAI/bge-base-en-v1.5"
@@ -20,10 +35,109 @@ class Config:
         TEMPERATURE = 0
         MAX_TOKENS = 8000
         USE_LOCAL = True
+        WARM_UP = True
+        WARM_UP_LLM = False
+
+    class Ingestion:
+        PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", os.cpu_count() or 1))
+        PAGES_PER_TASK = 50
+        UPLOAD_BLOCK_SIZE = 1 << 20
+        PAGES_PER_WINDOW = 20
+        BATCH_SIZE = 64
+        JOB_WORKERS = 2
+        # "reembed", "pooled" or "aligned"; see src/chunker.py
+        CHUNK_EMBEDDINGS = os.getenv("CHUNK_EMBEDDINGS", "reembed")
+
+    class EmbeddingCache:
+        ENABLED = True
+        MAX_ENTRIES = 200_000
+        # A hit only rewrites its last-used time when the stored one is older than this
+        TOUCH_INTERVAL_SECONDS = 10 * 60
+        # Entries written between size checks; the cache can overshoot MAX_ENTRIES by this much
+        EVICT_CHECK_INTERVAL = 500
+
+    class AnswerCache:
+        ENABLED = True
+        SIMILARITY_THRESHOLD = 0.95
+        TTL_SECONDS = 60 * 60
+        MAX_ENTRIES = 1000
+
+    class RetrievalCache:
+        ENABLED = True
+        TTL_SECONDS = 30 * 60
+        MAX_ENTRIES = 2000
 
     class Retriever:
         USE_RERANKER = True
         USE_CHAIN_FILTER = False
+        # "dense" for vector search only, "hybrid" to fuse it with BM25 via reciprocal-rank fusion
+        SEARCH_TYPE = os.getenv("RETRIEVER_SEARCH_TYPE", "hybrid")
+        # Two-stage retrieval: FETCH_K candidates are reranked down to TOP_N
+        FETCH_K = 20
+        TOP_N = 5
+        RERANK_SCORE_THRESHOLD = 0.0
+        # Shrinks FETCH_K when reranking would exceed this many milliseconds; None disables
+        LATENCY_BUDGET_MS = None
+        # Size of the thread pool that runs retrieval off the event loop
+        MAX_CONCURRENT_RETRIEVALS = int(os.getenv("MAX_CONCURRENT_RETRIEVALS", 4))
+        HYBRID_FETCH_K = 20
+        RRF_K = 60
+        BM25_K1 = 1.5
+        BM25_B = 0.75
+        # Query terms found in more than this share of chunks are skipped by BM25 search
+        BM25_MAX_DF_RATIO = 0.5
+
+    class Context:
+        TOKEN_BUDGET = 1500
+        # Rough ratio for English text with the Llama 3 tokenizer
+        CHARS_PER_TOKEN = 4
+        MAX_OVERLAP_CHARS = 200
+
+    class Serving:
+        MAX_QUEUE_SIZE = int(os.getenv("MAX_QUEUE_SIZE", 64))
+        MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", 2))
+        QUEUE_TIMEOUT_SECONDS = 30
+        GENERATION_TIMEOUT_SECONDS = 300
+
+    class UI:
+        # Streamed answers are re-rendered at most this often, or after this many new characters
+        RENDER_INTERVAL_SECONDS = 0.15
+        RENDER_EVERY_CHARS = 400
+        JOB_POLL_SECONDS = 2
+
+    class Auth:
+        POOL_SIZE = 4
+        # Falls back to a random key persisted in users.db when unset
+        SECRET_KEY = os.getenv("AUTH_SECRET_KEY")
+        TOKEN_TTL_SECONDS = 12 * 60 * 60
+        TOKEN_CACHE_SECONDS = 5 * 60
+        TOKEN_CACHE_SIZE = 10_000
+
+    class History:
+        # CONVERSATION_MESSAGES_LIMIT caps the message count; this caps their size
+        TOKEN_LIMIT = 1000
+        IN_MEMORY_MESSAGES = 20
+        MAX_SESSIONS = 500
+        WRITE_BATCH_SIZE = 32
+        FLUSH_INTERVAL_SECONDS = 2.0
+
+    class Logging:
+        LEVEL = os.getenv("LOG_LEVEL", "INFO")
+        DIR = Path(os.getenv("LOG_DIR", Path.cwd() / "logs"))
+        # One file per process, named from this template; rotation is only safe with a single writer
+        FILE = os.getenv("LOG_FILE", "{time}_{pid}.log")
+        MAX_BYTES = 10 * 1024 * 1024
+        BACKUP_COUNT = 5
+        # Records waiting for the writer thread; beyond this new records are dropped, not blocked on
+        QUEUE_SIZE = 10_000
+        # Fraction of requests whose INFO records are kept, per module; warnings and errors are always kept
+        SAMPLE_RATES = {"retriever": 0.1, "sparse_index": 0.1, "chain": 0.25, "vector_store": 0.1}
+
+    class Metrics:
+        # Prometheus text endpoint for the Streamlit app; api.py serves /metrics itself
+        ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+        HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+        PORT = int(os.getenv("METRICS_PORT", 9464))
 
     DEBUG = False
     CONVERSATION_MESSAGES_LIMIT = 6
\ No newline at end of file
@@ -0,0 +1,151 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from src.config import Config
+from logger.logging import logging
+
+
+def embedding_key(model_name: str, text: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed store of embedding vectors keyed by hash(model name, text)."""
+
+    def __init__(self, db_path: Path = None, max_entries: int = None):
+        self.db_path = Path(db_path or Config.Path.EMBEDDINGS_CACHE)
+        self.max_entries = max_entries or Config.EmbeddingCache.MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self.touch_interval = Config.EmbeddingCache.TOUCH_INTERVAL_SECONDS
+        self.evict_interval = Config.EmbeddingCache.EVICT_CHECK_INTERVAL
+        self._puts_since_evict = 0
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS embeddings
+                              (key TEXT PRIMARY KEY,
+                               vector BLOB NOT NULL,
+                               last_used INTEGER NOT NULL)''')
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        if not keys:
+            return found
+        now = int(time.time())
+        stale = []
+        with self._lock:
+            # SQLite caps the number of bound parameters, so look keys up in slices.
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector, last_used FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob, last_used in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+                    if now - last_used > self.touch_interval:
+                        stale.append(key)
+
+            # Access times only order eviction, so they are refreshed at most once per
+            # touch interval instead of writing on every hit.
+            if stale:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used=? WHERE key=?", [(now, key) for key in stale]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        now = int(time.time())
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items.items()],
+            )
+            # Counting rows is a full scan, so the size is only checked every few
+            # hundred inserts and a single query miss stays one write.
+            self._puts_since_evict += len(items)
+            if self._puts_since_evict >= self.evict_interval:
+                self._puts_since_evict = 0
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                '''DELETE FROM embeddings WHERE key IN
+                   (SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)''',
+                (overflow,),
+            )
+            logging.info("Evicted %d entries from the embedding cache.", overflow)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only runs the model for texts missing from the cache."""
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: Optional[EmbeddingCache] = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache or EmbeddingCache()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [embedding_key(self.model_name, text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = {key: list(vector) for key, vector in zip(missing.keys(), vectors)}
+            self.cache.put_many(computed)
+            cached.update(computed)
+
+        logging.info(
+            "Embedding cache: %d cached, %d computed (total hits=%d, misses=%d).",
+            len(texts) - len(missing), len(missing), self.cache.hits, self.cache.misses,
+        )
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        # FastEmbed prefixes queries differently from passages, so keep them in their own key space.
+        key = embedding_key(f"{self.model_name}:query", text)
+        cached = self.cache.get_many([key])
+        if key in cached:
+            return cached[key]
+        vector = list(self.embeddings.embed_query(text))
+        self.cache.put_many({key: vector})
+        return vector
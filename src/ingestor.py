@@ -1,22 +1,36 @@
+import time
 from pathlib import Path
-from typing import List
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-from langchain_community.document_loaders import PyPDFium2Loader
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import VectorStore
 from langchain_experimental.text_splitter import SemanticChunker
 from langchain_qdrant import Qdrant
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
 
+from src.answer_cache import answer_cache
+from src.chunker import SentenceEmbeddingChunker
 from src.config import Config
+from src.manifest import DocumentManifest, chunk_point_id, file_hash
+from src.model import create_embeddings
+from src.parser import ExtractedDocument, InvalidPDFException, iter_page_ranges
+from src.retrieval_cache import retrieval_cache
+from src.sparse_index import BM25Index
+from src.vector_store import PooledQdrant, client_pool, is_local, quantization_config, resolve_database_dir
 from logger.logging import logging
 
 class IngestionPipeline:
     # Initializing the Embedding model
-    def __init__(self):
+    def __init__(self, embeddings: Optional[Embeddings] = None):
+        self.failed: Dict[str, str] = {}
         try:
             logging.info("Initializing FastEmbedEmbeddings...")
-            self.embeddings = FastEmbedEmbeddings(model_name=Config.Model.EMBEDDINGS)
+            self.embeddings = embeddings or create_embeddings()
             logging.info("FastEmbedEmbeddings initialized successfully.")
 
             logging.info("Initializing SemanticChunker...")
@@ -32,39 +46,254 @@ class IngestionPipeline:
                 add_start_index=True
             )
             logging.info("RecursiveCharacterTextSplitter initialized successfully.")
+
+            if Config.Ingestion.CHUNK_EMBEDDINGS != "reembed":
+                self.chunker = SentenceEmbeddingChunker(
+                    self.embeddings, self.recursive_splitter, mode=Config.Ingestion.CHUNK_EMBEDDINGS
+                )
         
         except Exception as e:
             logging.exception("Failed to initialize components in IngestionPipeline: %s", e)
 
-    def ingest(self, doc_paths: List[Path], persist_directory: str = None) -> VectorStore:
-        documents = []
+    def _chunk_document(self, doc_path: Path, doc_hash: str, pages: List[str]) -> Tuple[List[Document], List[Optional[List[float]]]]:
+        document_text = "\n".join(pages)
+        logging.info("Loaded %d documents from %s.", len(pages), doc_path)
+
+        logging.info("Chunking documents...")
+        metadata = {"source": Path(doc_path).name, "doc_hash": doc_hash}
+        if Config.Ingestion.CHUNK_EMBEDDINGS == "reembed":
+            chunked_documents = self.recursive_splitter.split_documents(
+                self.semantic_splitter.create_documents([document_text], metadatas=[metadata])
+            )
+            vectors = [None] * len(chunked_documents)
+        else:
+            chunked_documents, vectors = self.chunker.split(document_text, metadata)
+        logging.info("Chunking is complete for %s", doc_path)
+        return chunked_documents, vectors
+
+    def _iter_chunks(self, doc_path: Path, doc_hash: str, pages: Iterable[str]) -> Iterator[Tuple[Document, Optional[List[float]]]]:
+        # Chunk a window of pages at a time so a large PDF never sits in memory as one string.
+        # The text check rides on the same pass, so each PDF is parsed only once.
+        pages = iter(pages)
+        has_text = False
+        while window := list(islice(pages, Config.Ingestion.PAGES_PER_WINDOW)):
+            self.progress(pages=len(window))
+            if not any(page.strip() for page in window):
+                continue
+            has_text = True
+            documents, vectors = self._chunk_document(doc_path, doc_hash, window)
+            yield from zip(documents, vectors)
+        if not has_text:
+            raise InvalidPDFException(f"The PDF '{Path(doc_path).name}' does not contain any text.")
+
+    def _index_document(self, client: QdrantClient, sparse_index: BM25Index, document: ExtractedDocument,
+                        pages: Iterable[str]) -> int:
+        """Stream one document into the collection in fixed-size batches; returns the chunk count."""
+        chunks = self._iter_chunks(document.path, document.doc_hash, pages)
+
+        chunk_count = 0
+        try:
+            while batch := list(islice(chunks, Config.Ingestion.BATCH_SIZE)):
+                documents = [chunk for chunk, _ in batch]
+                vectors = self._embed_missing(documents, [vector for _, vector in batch])
+                self.progress(chunks=len(documents))
+                if not self._collection_ready:
+                    self._ensure_collection(client, len(vectors[0]))
+                    self._collection_ready = True
+                ids = [chunk_point_id(document.doc_hash, chunk_count + i) for i in range(len(documents))]
+                for i, chunk in enumerate(documents):
+                    chunk.metadata["chunk_index"] = chunk_count + i
+                self._upsert(client, documents, ids, vectors)
+                chunk_count += len(documents)
+                self.progress(points=len(documents))
+                sparse_index.add(ids, documents, document.doc_hash)
+                logging.info("Upserted %d chunks for %s.", chunk_count, document.path)
+        except Exception:
+            if chunk_count:
+                # Drop the partial document so the manifest and the collection stay in step.
+                client.delete(
+                    collection_name=Config.Database.DOCUMENTS_COLLECTION,
+                    points_selector=models.PointIdsList(
+                        points=[chunk_point_id(document.doc_hash, i) for i in range(chunk_count)]
+                    ),
+                )
+                sparse_index.delete_document(document.doc_hash)
+            raise
+        return chunk_count
+
+    def _embed_missing(self, documents: List[Document], vectors: List[Optional[List[float]]]) -> List[List[float]]:
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            embedded = self.embeddings.embed_documents([documents[i].page_content for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = list(vector)
+        return vectors
+
+    def _upsert(self, client: QdrantClient, documents: List[Document], ids: List[str], vectors: List[List[float]]) -> None:
+        # Same payload layout as langchain's Qdrant store, so retrieval reads these points as usual.
+        client.upsert(
+            collection_name=Config.Database.DOCUMENTS_COLLECTION,
+            points=[
+                models.PointStruct(
+                    id=point_id,
+                    vector=vector,
+                    payload={
+                        Qdrant.CONTENT_KEY: document.page_content,
+                        Qdrant.METADATA_KEY: document.metadata,
+                    },
+                )
+                for point_id, document, vector in zip(ids, documents, vectors)
+            ],
+        )
+
+    def _ensure_collection(self, client: QdrantClient, vector_size: int) -> None:
+        collection_name = Config.Database.DOCUMENTS_COLLECTION
+        quantization = quantization_config()
+        if client.collection_exists(collection_name):
+            config = client.get_collection(collection_name).config
+            if config.params.vectors.size != vector_size:
+                # Only another embedding model gives other sizes, and documents indexed with it
+                # were dropped as outdated, so nothing searchable is lost by starting over.
+                client.delete_collection(collection_name)
+                logging.info("Dropped collection %s built with %d-dimensional vectors.",
+                             collection_name, config.params.vectors.size)
+            else:
+                # The embedded client stores the setting but always searches full vectors.
+                if not is_local(client) and config.quantization_config != quantization:
+                    client.update_collection(
+                        collection_name, quantization_config=quantization or models.Disabled.DISABLED
+                    )
+                    logging.info("Set quantization of collection %s to %s.", collection_name, Config.Database.QUANTIZATION)
+                return
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE),
+            quantization_config=quantization,
+        )
+        logging.info(
+            "Created collection %s with %d-dimensional vectors (quantization: %s).",
+            collection_name, vector_size, Config.Database.QUANTIZATION,
+        )
+
+    def _sync(self, client: QdrantClient, database_dir: Path, manifest: DocumentManifest,
+              doc_paths: List[Union[ExtractedDocument, Path]], replace: bool) -> Tuple[List[str], int]:
+        """Index new documents and, when replacing, delete those no longer listed; returns the removed hashes and the unchanged count."""
+        sparse_index = BM25Index.for_directory(database_dir)
+
+        if not manifest.manifest_path.exists() and client.collection_exists(Config.Database.DOCUMENTS_COLLECTION):
+            # Collections built before the manifest existed cannot be diffed, so start over once.
+            logging.info("No manifest found; dropping untracked collection.")
+            client.delete_collection(Config.Database.DOCUMENTS_COLLECTION)
+            sparse_index.clear()
+
+        current = {}
         for doc_path in doc_paths:
+            if isinstance(doc_path, ExtractedDocument):
+                current[doc_path.doc_hash] = doc_path
+                continue
             try:
-                logging.info(f"Loading documents from {doc_path}...")
-                loaded_documents = PyPDFium2Loader(doc_path).load()
-                document_text = "\n".join([doc.page_content for doc in loaded_documents])
-                logging.info(f"Loaded {len(loaded_documents)} documents from {doc_path}.")
-
-                logging.info("Chunking documents...")
-                chunked_documents = self.recursive_splitter.split_documents(
-                    self.semantic_splitter.create_documents([document_text])
+                doc_hash = file_hash(doc_path)
+                current[doc_hash] = ExtractedDocument(path=Path(doc_path), doc_hash=doc_hash)
+            except OSError as e:
+                logging.exception("Error hashing document %s: %s", doc_path, e)
+
+        # Documents chunked or embedded differently are dropped here and indexed again below.
+        self._delete_documents(client, sparse_index, manifest,
+                               [doc_hash for doc_hash in manifest.outdated() if doc_hash in current])
+
+        pending = {doc_hash: document for doc_hash, document in current.items() if doc_hash not in manifest.documents}
+        skipped = len(current) - len(pending)
+        logging.info("Loading %d new documents...", len(pending))
+
+        # Pending documents share one stream of page ranges, so parsing runs ahead
+        # across file boundaries while earlier documents are chunked and embedded.
+        parsed = groupby(iter_page_ranges([document.path for document in pending.values()]), key=itemgetter(0))
+        for doc_hash, document in pending.items():
+            try:
+                started = time.perf_counter()
+                _, ranges = next(parsed)
+                pages = (page for _, future in ranges for page in future.result())
+                chunk_count = self._index_document(client, sparse_index, document, pages)
+                if not chunk_count:
+                    continue
+                manifest.add(doc_hash, document.path.name, chunk_count)
+                manifest.save()
+                logging.info(
+                    "Indexed %d chunks for %s in %.2fs (%s chunk embeddings).",
+                    chunk_count, document.path, time.perf_counter() - started, Config.Ingestion.CHUNK_EMBEDDINGS,
                 )
-                documents.extend(chunked_documents)
-                logging.info("Chunking is complete for %s", doc_path)
 
+            except InvalidPDFException as e:
+                logging.error("Error processing file '%s': %s", document.path.name, e)
+                self.failed[doc_hash] = str(e)
             except Exception as e:
-                logging.exception("Error processing document %s: %s", doc_path, e)
-        
+                logging.exception("Error processing document %s: %s", document.path, e)
+                self.failed[doc_hash] = f"The PDF '{document.path.name}' could not be processed."
+
+        removed = [doc_hash for doc_hash in manifest.documents if doc_hash not in current] if replace else []
+        if removed and not any(doc_hash in manifest.documents for doc_hash in current):
+            # None of the replacement documents could be indexed; keep the old set rather than empty the store.
+            logging.error("No document of the new set could be indexed; keeping the %d indexed ones.", len(removed))
+            removed = []
+        self._delete_documents(client, sparse_index, manifest, removed)
+        return removed, skipped
+
+    @staticmethod
+    def _delete_documents(client: QdrantClient, sparse_index: BM25Index, manifest: DocumentManifest,
+                          doc_hashes: List[str]) -> None:
+        for doc_hash in doc_hashes:
+            try:
+                client.delete(
+                    collection_name=Config.Database.DOCUMENTS_COLLECTION,
+                    points_selector=models.PointIdsList(points=manifest.point_ids(doc_hash)),
+                )
+                sparse_index.delete_document(doc_hash)
+                logging.info("Removed %s from the vector store.", manifest.documents[doc_hash]["source"])
+                manifest.remove(doc_hash)
+            except Exception as e:
+                logging.exception("Failed to delete points of document %s: %s", doc_hash, e)
+
+    def ingest(
+        self,
+        doc_paths: List[Union[ExtractedDocument, Path]],
+        persist_directory: str = None,
+        progress: Optional[Callable[..., None]] = None,
+        replace: bool = True,
+    ) -> VectorStore:
+        """Bring the store at ``persist_directory`` in line with ``doc_paths``.
+
+        With ``replace`` the paths are the whole document set and anything else indexed
+        is removed; without it they are added to what the store already holds.
+        ``progress`` is called with increments of ``pages``, ``chunks`` (embedded)
+        and ``points`` (upserted) as each batch goes through. Documents that could not
+        be indexed are left in ``self.failed``, mapping their hash to the reason.
+        """
+        self.progress = progress or (lambda **counts: None)
+        self.failed = {}
+        # The collection is checked once, when the first batch gives the vector size.
+        self._collection_ready = False
+        database_dir = resolve_database_dir(persist_directory)
+        manifest = DocumentManifest(database_dir / Config.Database.MANIFEST_FILE)
+        previous_version = manifest.version
+
         try:
-            logging.info("Creating Qdrant vector store...")
-            vector_store = Qdrant.from_documents(
-                documents=documents,
-                embedding=self.embeddings,
-                path=Config.Path.DATABASE_DIR,
-                collection_name=Config.Database.DOCUMENTS_COLLECTION,
-            )
-            logging.info("Qdrant vector store created successfully.")
-            return vector_store
-        
+            vector_store = PooledQdrant(database_dir, embeddings=self.embeddings)
         except Exception as e:
-            logging.exception("Failed to create Qdrant vector store: %s", e)
+            logging.exception("Failed to open Qdrant vector store: %s", e)
+            return None
+
+        # Checked out for the whole run so the pool cannot close the client between batches.
+        with client_pool.checkout(database_dir) as client:
+            removed, skipped = self._sync(client, database_dir, manifest, doc_paths, replace)
+
+        manifest.save()
+        if manifest.version != previous_version:
+            answer_cache.invalidate(previous_version)
+            retrieval_cache.invalidate(database_dir.resolve())
+        logging.info(
+            "Ingest finished: %d removed, %d unchanged, %d indexed.",
+            len(removed), skipped, len(manifest.documents) - skipped,
+        )
+        if hasattr(self.embeddings, "cache"):
+            logging.info("Embedding cache stats: %s", self.embeddings.cache.stats())
+        return vector_store
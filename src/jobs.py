@@ -0,0 +1,208 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.config import Config
+from src.ingestor import IngestionPipeline
+from src.manifest import file_hash
+from src.parser import ExtractedDocument, InvalidPDFException
+from logger.logging import logging
+
+
+@dataclass
+class IngestionJob:
+    id: str
+    user_id: str
+    store_dir: str
+    files: List[str]
+    status: str
+    pages: int = 0
+    chunks: int = 0
+    points: int = 0
+    created: float = 0.0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    error: Optional[str] = None
+    # Content hashes taken while staging, in the order of ``files``
+    doc_hashes: Optional[List[str]] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed")
+
+    @property
+    def chunks_per_second(self) -> float:
+        if not self.started:
+            return 0.0
+        elapsed = (self.finished or time.time()) - self.started
+        return self.chunks / elapsed if elapsed > 0 else 0.0
+
+
+class IngestionJobQueue:
+    """Runs ingestion in background workers and tracks each job in a SQLite table.
+
+    Jobs left queued or running by a previous process are picked up again on
+    start; the ingest manifest makes that resume skip documents already indexed.
+    """
+
+    def __init__(self, db_path: Path, workers: int):
+        self.db_path = Path(db_path)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._lock = threading.Lock()
+        self._store_locks: Dict[str, threading.Lock] = {}
+        self._started = False
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS jobs
+                              (id TEXT PRIMARY KEY,
+                               user_id TEXT NOT NULL,
+                               store_dir TEXT NOT NULL,
+                               files TEXT NOT NULL,
+                               status TEXT NOT NULL,
+                               pages INTEGER NOT NULL DEFAULT 0,
+                               chunks INTEGER NOT NULL DEFAULT 0,
+                               points INTEGER NOT NULL DEFAULT 0,
+                               created REAL NOT NULL,
+                               started REAL,
+                               finished REAL,
+                               error TEXT,
+                               doc_hashes TEXT)''')
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if "doc_hashes" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN doc_hashes TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_id, created)")
+        self._conn.commit()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created"
+            ).fetchall()
+        for (job_id,) in rows:
+            logging.info("Resuming ingestion job %s.", job_id)
+            self._executor.submit(self._run, job_id)
+
+    def submit(self, user_id: str, store_dir: Path, documents: List[ExtractedDocument]) -> str:
+        """Queue staged documents for ingestion; their hashes from staging are reused, not recomputed."""
+        self.start()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                '''INSERT INTO jobs (id, user_id, store_dir, files, doc_hashes, status, created)
+                   VALUES (?, ?, ?, ?, ?, 'queued', ?)''',
+                (
+                    job_id, str(user_id), str(store_dir),
+                    json.dumps([str(document.path) for document in documents]),
+                    json.dumps([document.doc_hash for document in documents]),
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            row = self._conn.execute(
+                '''SELECT id, user_id, store_dir, files, status, pages, chunks, points,
+                          created, started, finished, error, doc_hashes FROM jobs WHERE id=?''',
+                (job_id,),
+            ).fetchone()
+        return self._to_job(row) if row else None
+
+    def latest(self, user_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE user_id=? ORDER BY created DESC LIMIT 1", (str(user_id),)
+            ).fetchone()
+        return self.get(row[0]) if row else None
+
+    @staticmethod
+    def _to_job(row: tuple) -> IngestionJob:
+        return IngestionJob(
+            id=row[0], user_id=row[1], store_dir=row[2], files=json.loads(row[3]), status=row[4],
+            pages=row[5], chunks=row[6], points=row[7], created=row[8], started=row[9],
+            finished=row[10], error=row[11], doc_hashes=json.loads(row[12]) if row[12] else None,
+        )
+
+    def _update(self, job_id: str, **fields) -> None:
+        assignments = ", ".join(f"{name}=?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id=?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def _increment(self, job_id: str, **counts) -> None:
+        assignments = ", ".join(f"{name}={name}+?" for name in counts)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id=?", (*counts.values(), job_id))
+            self._conn.commit()
+
+    @staticmethod
+    def _remove_staged_files(files: List[str]) -> None:
+        staging_dirs = {Path(f).parent for f in files}
+        for f in files:
+            Path(f).unlink(missing_ok=True)
+        for staging_dir in staging_dirs:
+            if (Config.Path.DOCUMENTS_DIR in staging_dir.parents and staging_dir.exists()
+                    and not any(staging_dir.iterdir())):
+                staging_dir.rmdir()
+
+    @staticmethod
+    def _documents(job: IngestionJob) -> List[ExtractedDocument]:
+        doc_hashes = job.doc_hashes or [None] * len(job.files)
+        return [
+            ExtractedDocument(path=Path(f), doc_hash=doc_hash or file_hash(f))
+            for f, doc_hash in zip(job.files, doc_hashes)
+        ]
+
+    def _run(self, job_id: str) -> None:
+        job = self.get(job_id)
+        with self._lock:
+            store_lock = self._store_locks.setdefault(job.store_dir, threading.Lock())
+
+        # Jobs for one store run one at a time, in submission order.
+        with store_lock:
+            self._update(job_id, status="running", started=time.time(), pages=0, chunks=0, points=0)
+            try:
+                # The file list is the user's whole document set, so ingesting part of it would
+                # delete the documents whose staged copies are gone.
+                missing = [Path(f).name for f in job.files if not Path(f).exists()]
+                if missing:
+                    raise FileNotFoundError(f"Staged files are missing: {', '.join(missing)}")
+                documents = self._documents(job)
+                if not documents:
+                    raise InvalidPDFException("No PDF files to ingest.")
+                pipeline = IngestionPipeline()
+                pipeline.ingest(
+                    documents,
+                    persist_directory=job.store_dir,
+                    progress=lambda **counts: self._increment(job_id, **counts),
+                )
+                skipped = " ".join(pipeline.failed.values()) or None
+                if len(pipeline.failed) == len(documents):
+                    raise InvalidPDFException(skipped)
+                self._update(job_id, status="done", finished=time.time(), error=skipped)
+                self._remove_staged_files(job.files)
+                job = self.get(job_id)
+                logging.info(
+                    "Ingestion job %s finished: %d pages, %d chunks, %d points (%.1f chunks/s).",
+                    job_id, job.pages, job.chunks, job.points, job.chunks_per_second,
+                )
+            except Exception as e:
+                logging.exception("Ingestion job %s failed: %s", job_id, e)
+                self._update(job_id, status="failed", finished=time.time(), error=str(e))
+                self._remove_staged_files(job.files)
+
+
+ingestion_jobs = IngestionJobQueue(db_path=Config.Path.JOBS_DB, workers=Config.Ingestion.JOB_WORKERS)
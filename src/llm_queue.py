@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+
+from langchain_core.messages import BaseMessage
+
+from src.config import Config
+from src.model import create_llm
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class QueueTimeoutError(Exception):
+    pass
+
+
+class GenerationTimeoutError(Exception):
+    pass
+
+
+class GenerationQueue:
+    """Bounded request queue in front of the shared LLM, drained by a fixed number of async workers.
+
+    The queue runs its own event loop on a background thread so synchronous
+    servers (Flask) can submit to it from their request threads.
+    """
+
+    def __init__(self, max_queue_size: int, max_in_flight: int, queue_timeout: float, generation_timeout: float):
+        self.max_queue_size = max_queue_size
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.generation_timeout = generation_timeout
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._dequeued = 0
+        self._total_wait = 0.0
+        self._last_wait = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            ready = threading.Event()
+            threading.Thread(target=self._run, args=(ready,), name="llm-queue", daemon=True).start()
+            ready.wait()
+
+    def _run(self, ready: threading.Event) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        for _ in range(self.max_in_flight):
+            self._loop.create_task(self._worker())
+        ready.set()
+        self._loop.run_forever()
+
+    async def _worker(self) -> None:
+        while True:
+            future, messages, enqueued = await self._queue.get()
+            try:
+                wait = time.monotonic() - enqueued
+                self._last_wait = wait
+                self._total_wait += wait
+                self._dequeued += 1
+                if future.cancelled():
+                    continue
+                if wait > self.queue_timeout:
+                    self.timed_out += 1
+                    future.set_exception(QueueTimeoutError(f"Request waited {wait:.1f}s in the queue."))
+                    continue
+
+                self.in_flight += 1
+                try:
+                    response = await asyncio.wait_for(
+                        create_llm().agenerate([messages]), self.generation_timeout
+                    )
+                    if not future.cancelled():
+                        future.set_result(response.generations[0][0].text)
+                except asyncio.TimeoutError:
+                    # A hung model call must not hold this worker slot forever.
+                    self.timed_out += 1
+                    if not future.cancelled():
+                        future.set_exception(
+                            GenerationTimeoutError(f"Generation took longer than {self.generation_timeout:g}s.")
+                        )
+                except Exception as e:
+                    if not future.cancelled():
+                        future.set_exception(e)
+                finally:
+                    self.in_flight -= 1
+                    self.completed += 1
+            finally:
+                self._queue.task_done()
+
+    async def _submit(self, messages: List[BaseMessage]) -> str:
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait((future, messages, time.monotonic()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError("Generation queue is full.")
+        return await future
+
+    def generate_sync(self, messages: List[BaseMessage], timeout: Optional[float] = None) -> str:
+        """Submit from a synchronous request thread and block until the completion is ready."""
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self._submit(messages), self._loop)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            # Cancelling the submission cancels the queued request, which the worker then skips.
+            future.cancel()
+            raise
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue_size": self.max_queue_size,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "last_wait_seconds": round(self._last_wait, 4),
+            "avg_wait_seconds": round(self._total_wait / self._dequeued, 4) if self._dequeued else 0.0,
+        }
+
+
+generation_queue = GenerationQueue(
+    max_queue_size=Config.Serving.MAX_QUEUE_SIZE,
+    max_in_flight=Config.Serving.MAX_IN_FLIGHT,
+    queue_timeout=Config.Serving.QUEUE_TIMEOUT_SECONDS,
+    generation_timeout=Config.Serving.GENERATION_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+from src.config import Config
+from logger.logging import logging
+
+
+def file_hash(file_path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with Path(file_path).open("rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_point_id(doc_hash: str, chunk_index: int) -> str:
+    """Stable Qdrant point ID for the n-th chunk of a document."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{doc_hash}:{chunk_index}"))
+
+
+def index_settings() -> dict:
+    """Chunking and embedding configuration that a document's stored vectors depend on."""
+    return {"embeddings": Config.Model.EMBEDDINGS, "chunk_embeddings": Config.Ingestion.CHUNK_EMBEDDINGS}
+
+
+class DocumentManifest:
+    """JSON record of the documents currently indexed, keyed by file content hash."""
+
+    def __init__(self, manifest_path: Path):
+        self.manifest_path = Path(manifest_path)
+        self.documents: Dict[str, dict] = {}
+        if self.manifest_path.exists():
+            try:
+                self.documents = json.loads(self.manifest_path.read_text())["documents"]
+            except (ValueError, KeyError) as e:
+                logging.error("Ignoring unreadable manifest %s: %s", self.manifest_path, e)
+
+    def point_ids(self, doc_hash: str) -> List[str]:
+        chunks = self.documents[doc_hash]["chunks"]
+        return [chunk_point_id(doc_hash, i) for i in range(chunks)]
+
+    @property
+    def version(self) -> str:
+        """Stamp that changes whenever the set of indexed documents changes."""
+        digest = hashlib.sha256(json.dumps(self.documents, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def add(self, doc_hash: str, source: str, chunks: int) -> None:
+        self.documents[doc_hash] = {"source": source, "chunks": chunks, "settings": index_settings()}
+
+    def outdated(self) -> List[str]:
+        """Documents indexed with other settings than the current ones (or before they were recorded)."""
+        settings = index_settings()
+        return [doc_hash for doc_hash, entry in self.documents.items() if entry.get("settings") != settings]
+
+    def remove(self, doc_hash: str) -> None:
+        self.documents.pop(doc_hash, None)
+
+    def save(self) -> None:
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"documents": self.documents}, indent=2))
+        tmp_path.replace(self.manifest_path)
+
+
+def collection_version(database_dir: Path) -> str:
+    return DocumentManifest(Path(database_dir) / Config.Database.MANIFEST_FILE).version
+
+
+def has_documents(database_dir: Path) -> bool:
+    return bool(DocumentManifest(Path(database_dir) / Config.Database.MANIFEST_FILE).documents)
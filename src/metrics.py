@@ -0,0 +1,152 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+
+from src.config import Config
+from logger.logging import logging
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 200)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 10, 15, 20, 50)
+TOKEN_BUCKETS = (50, 100, 250, 500, 750, 1000, 1500, 2000, 4000, 8000)
+
+
+class Histogram:
+    """Cumulative-bucket histogram rendered in the Prometheus text exposition format."""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f"{self.name}_sum {total:.6f}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+            f"{self.name} {self._value}",
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, buckets))
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._register(Counter(name, documentation))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = MetricsRegistry()
+
+questions_total = registry.counter("rag_questions_total", "Questions answered by ask_question.")
+question_errors_total = registry.counter("rag_question_errors_total", "Questions that failed with an exception.")
+answer_cache_hits_total = registry.counter("rag_answer_cache_hits_total", "Questions served from the answer cache.")
+query_embedding_seconds = registry.histogram("rag_query_embedding_seconds", "Time to embed a query.")
+vector_search_seconds = registry.histogram("rag_vector_search_seconds", "Qdrant similarity search time, excluding query embedding.")
+keyword_search_seconds = registry.histogram("rag_keyword_search_seconds", "BM25 search time.")
+rerank_seconds = registry.histogram("rag_rerank_seconds", "FlashRank reranking time.")
+retrieval_seconds = registry.histogram("rag_retrieval_seconds", "Whole retriever step as seen by ask_question.")
+prompt_build_seconds = registry.histogram("rag_prompt_build_seconds", "Context packing and rendering time.")
+time_to_first_token_seconds = registry.histogram("rag_time_to_first_token_seconds", "From question to first streamed answer token.")
+answer_seconds = registry.histogram("rag_answer_seconds", "From question to last streamed answer token.")
+tokens_per_second = registry.histogram("rag_generation_tokens_per_second", "Streamed chunks per second after the first token.", RATE_BUCKETS)
+retrieved_chunks = registry.histogram("rag_retrieved_chunks", "Chunks returned by the retriever.", COUNT_BUCKETS)
+context_chunks = registry.histogram("rag_context_chunks", "Chunks packed into the prompt context.", COUNT_BUCKETS)
+context_tokens = registry.histogram("rag_context_tokens", "Estimated tokens of packed context.", TOKEN_BUCKETS)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(host: str = None, port: int = None) -> None:
+    """Serve /metrics from a daemon thread; safe to call on every Streamlit rerun."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return
+        host = host or Config.Metrics.HOST
+        port = port or Config.Metrics.PORT
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logging.error("Could not start metrics server on %s:%d: %s", host, port, e)
+            return
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        logging.info("Serving metrics on http://%s:%d/metrics", host, port)
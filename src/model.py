@@ -1,11 +1,34 @@
+import threading
+from typing import Callable, Dict
+
 from langchain_ollama import ChatOllama
 from langchain_community.document_compressors.flashrank_rerank import FlashrankRerank
 from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.language_models import BaseLanguageModel
 from src.config import Config
+from src.embedding_cache import CachedEmbeddings
+from logger.logging import logging
 from langchain_community.llms import Ollama
 
-def create_llm() -> BaseLanguageModel:
+# Process-wide registry: every model is loaded once, on first use, and shared by all callers.
+_models: Dict[str, object] = {}
+_models_lock = threading.Lock()
+_warmed_up = False
+
+def _get_or_load(name: str, loader: Callable[[], object]):
+    model = _models.get(name)
+    if model is None:
+        with _models_lock:
+            model = _models.get(name)
+            if model is None:
+                model = loader()
+                if model is not None:
+                    _models[name] = model
+    return model
+
+def _load_llm() -> BaseLanguageModel:
     try:
         llm = ChatOllama(
             model= Config.Model.LOCAL_LLM,
@@ -20,8 +43,36 @@ def create_llm() -> BaseLanguageModel:
         print(f"Error creating LLM: {e}")
         return None
 
-def create_embeddings() -> FastEmbedEmbeddings:
-    return FastEmbedEmbeddings(model_name=Config.Model.EMBEDDINGS)
+def _load_embeddings() -> Embeddings:
+    embeddings = FastEmbedEmbeddings(model_name=Config.Model.EMBEDDINGS)
+    if Config.EmbeddingCache.ENABLED:
+        return CachedEmbeddings(embeddings, model_name=Config.Model.EMBEDDINGS)
+    return embeddings
+
+def create_llm() -> BaseLanguageModel:
+    return _get_or_load("llm", _load_llm)
+
+def create_embeddings() -> Embeddings:
+    return _get_or_load("embeddings", _load_embeddings)
 
 def create_reranker() -> FlashrankRerank:
-    return FlashrankRerank(model=Config.Model.RERANKER)
+    return _get_or_load("reranker", lambda: FlashrankRerank(model=Config.Model.RERANKER))
+
+def warm_up(include_llm: bool = False) -> None:
+    """Load the shared models and run one tiny inference through each so first queries are fast."""
+    global _warmed_up
+    if _warmed_up:
+        return
+    with _models_lock:
+        if _warmed_up:
+            return
+        _warmed_up = True
+    # Bypass the embedding cache so the ONNX session actually runs once.
+    embeddings = create_embeddings()
+    getattr(embeddings, "embeddings", embeddings).embed_query("warm up")
+    create_reranker().compress_documents([Document(page_content="warm up")], "warm up")
+    if include_llm:
+        llm = create_llm()
+        if llm is not None:
+            llm.invoke("Hi")
+    logging.info("Models have been warmed up.")
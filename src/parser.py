@@ -0,0 +1,136 @@
+import atexit
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import chain, islice
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import pypdfium2
+
+from src.config import Config
+from logger.logging import logging
+
+
+class InvalidPDFException(Exception):
+    pass
+
+
+@dataclass
+class ExtractedDocument:
+    """An uploaded PDF with the content hash computed while it was saved."""
+
+    path: Path
+    doc_hash: str
+
+
+# PDFium is not thread-safe, and ingestion jobs run on several threads, so every
+# PDFium call in a process goes through this lock. Pool workers each hold their own.
+_pdfium_lock = threading.Lock()
+
+
+def count_pages(doc_path: Path) -> int:
+    with _pdfium_lock:
+        pdf = pypdfium2.PdfDocument(str(doc_path))
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+
+def parse_page_range(doc_path: Path, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) the same way PyPDFium2Loader does."""
+    with _pdfium_lock:
+        pdf = pypdfium2.PdfDocument(str(doc_path))
+        try:
+            pages = []
+            for page_number in range(start, min(stop, len(pdf))):
+                page = pdf[page_number]
+                text_page = page.get_textpage()
+                pages.append(text_page.get_text_range() + "\n")
+                text_page.close()
+                page.close()
+            return pages
+        finally:
+            pdf.close()
+
+
+def _page_ranges(page_count: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    return [
+        (start, min(start + pages_per_task, page_count))
+        for start in range(0, max(page_count, 1), pages_per_task)
+    ]
+
+
+# One process pool for all parsing, started on first use and shared across documents and callers.
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawned, not forked: the parent has threads that may hold the PDFium lock.
+            _executor = ProcessPoolExecutor(max_workers=Config.Ingestion.PARSE_WORKERS, mp_context=get_context("spawn"))
+            atexit.register(_executor.shutdown, cancel_futures=True)
+        return _executor
+
+
+def _tasks(doc_paths: Iterable[Path]) -> Iterator[Tuple[Path, Optional[Tuple[int, int]], Optional[Exception]]]:
+    for doc_path in doc_paths:
+        try:
+            ranges = _page_ranges(count_pages(doc_path), Config.Ingestion.PAGES_PER_TASK)
+        except Exception as e:
+            yield doc_path, None, e
+            continue
+        for page_range in ranges:
+            yield doc_path, page_range, None
+
+
+def _run_now(doc_path: Path, page_range: Optional[Tuple[int, int]], error: Optional[Exception]) -> Future:
+    future = Future()
+    try:
+        if error:
+            raise error
+        future.set_result(parse_page_range(doc_path, *page_range))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def _submit(executor: ProcessPoolExecutor, doc_path: Path, page_range: Optional[Tuple[int, int]],
+            error: Optional[Exception]) -> Tuple[Path, Future]:
+    if error:
+        return doc_path, _run_now(doc_path, page_range, error)
+    return doc_path, executor.submit(parse_page_range, doc_path, *page_range)
+
+
+def iter_page_ranges(doc_paths: Iterable[Path], workers: Optional[int] = None) -> Iterator[Tuple[Path, Future]]:
+    """Yield ``(doc_path, future)`` for every page range of every PDF, in order.
+
+    Each future resolves to the text of its pages, or raises if the file could not be
+    opened or parsed. Up to ``workers`` ranges are parsed ahead on the shared pool,
+    across file boundaries, so a batch of small PDFs still parses in parallel while
+    memory stays bounded; a single range is parsed in-process.
+    """
+    workers = workers or Config.Ingestion.PARSE_WORKERS
+    tasks = _tasks(doc_paths)
+    first = list(islice(tasks, 2))
+    tasks = chain(first, tasks)
+
+    if workers <= 1 or len(first) <= 1:
+        for doc_path, page_range, error in tasks:
+            yield doc_path, _run_now(doc_path, page_range, error)
+        return
+
+    executor = _get_executor()
+    in_flight = deque(_submit(executor, *task) for task in islice(tasks, workers))
+    while in_flight:
+        doc_path, future = in_flight.popleft()
+        next_task = next(tasks, None)
+        if next_task:
+            in_flight.append(_submit(executor, *next_task))
+        yield doc_path, future
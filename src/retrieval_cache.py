@@ -0,0 +1,107 @@
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.config import Config
+from src.manifest import collection_version
+from logger.logging import logging
+
+
+def normalize_query(query: str) -> str:
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip("?!. ")
+
+
+def _documents_size(documents: List[Document]) -> int:
+    return sum(
+        sys.getsizeof(doc.page_content) + sum(sys.getsizeof(v) for v in doc.metadata.values())
+        for doc in documents
+    )
+
+
+class RetrievalCache:
+    """LRU/TTL cache of retrieved (and reranked) documents keyed by normalized query and index version."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, int, List[Document]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[List[Document]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[2])
+            if entry:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple[str, str, str], documents: List[Document]) -> None:
+        size = _documents_size(documents)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic(), size, list(documents))
+            self._bytes += size
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, database_dir: Optional[Path] = None) -> None:
+        """Drop cached results for one store, or for every store when none is given."""
+        with self._lock:
+            for key in [k for k in self._entries if database_dir is None or k[0] == str(database_dir)]:
+                self._drop(key)
+
+    def _drop(self, key: Tuple[str, str, str]) -> None:
+        self._bytes -= self._entries.pop(key)[1]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+retrieval_cache = RetrievalCache(
+    ttl_seconds=Config.RetrievalCache.TTL_SECONDS,
+    max_entries=Config.RetrievalCache.MAX_ENTRIES,
+)
+
+
+class CachedRetriever(BaseRetriever):
+    """Serves repeated queries against an unchanged index from the retrieval cache."""
+
+    retriever: BaseRetriever
+    database_dir: str
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        key = (self.database_dir, collection_version(Path(self.database_dir)), normalize_query(query))
+        documents = retrieval_cache.get(key)
+        if documents is not None:
+            logging.info("Retrieval cache hit: %s", retrieval_cache.stats())
+            return documents
+        documents = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        retrieval_cache.put(key, documents)
+        return documents
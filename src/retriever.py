@@ -1,38 +1,208 @@
-from typing import Optional
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from flashrank import RerankRequest
 
 from langchain.retrievers import ContextualCompressionRetriever
 from langchain.retrievers.document_compressors.chain_filter import LLMChainFilter
+from langchain_community.document_compressors.flashrank_rerank import FlashrankRerank
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
 from langchain_core.language_models import BaseLanguageModel
+from langchain_core.retrievers import BaseRetriever
 from langchain_core.vectorstores import VectorStore, VectorStoreRetriever
-from langchain_qdrant import Qdrant
 
+from src import metrics
 from src.config import Config
 from src.model import create_embeddings, create_reranker
+from src.retrieval_cache import CachedRetriever
+from src.sparse_index import BM25Index
+from src.vector_store import PooledQdrant, resolve_database_dir, search_params
 from logger.logging import logging
 
-def create_retriever(llm: BaseLanguageModel, vector_store: Optional[VectorStore] = None) -> VectorStoreRetriever:
+# Embedding, local Qdrant search and FlashRank are blocking CPU work; they run here so
+# the event loop keeps streaming tokens for other sessions.
+retrieval_executor = ThreadPoolExecutor(
+    max_workers=Config.Retriever.MAX_CONCURRENT_RETRIEVALS, thread_name_prefix="retrieval"
+)
+
+async def run_off_loop(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    # Carry the caller's context (request/session log IDs) into the worker thread.
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(retrieval_executor, partial(context.run, func, *args, **kwargs))
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = doc.metadata.get("_id") or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            documents.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [documents[key] for key in ranked]
+
+
+def dense_search(vector_store: VectorStore, query: str, k: int,
+                 vector: Optional[List[float]] = None) -> List[Document]:
+    """Similarity search with query embedding and vector search timed separately.
+
+    A ``vector`` already computed for ``query`` skips the embedding step.
+    """
+    if vector is None:
+        with metrics.query_embedding_seconds.time():
+            vector = vector_store.embeddings.embed_query(query)
+    with metrics.vector_search_seconds.time():
+        return vector_store.similarity_search_by_vector(vector, k=k, search_params=search_params())
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense vector search fused with BM25 keyword search by reciprocal rank."""
+
+    vector_store: VectorStore
+    sparse_index: BM25Index
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def search(self, query: str, k: int, vector: Optional[List[float]] = None) -> List[Document]:
+        fetch_k = max(self.fetch_k, k)
+        dense = dense_search(self.vector_store, query, fetch_k, vector)
+        with metrics.keyword_search_seconds.time():
+            sparse = [doc for doc, _ in self.sparse_index.search(query, fetch_k)]
+        return reciprocal_rank_fusion([dense, sparse], k, self.rrf_k)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.search(query, self.k)
+
+
+def fetch_candidates(retriever: BaseRetriever, query: str, k: int,
+                     vector: Optional[List[float]] = None) -> List[Document]:
+    if isinstance(retriever, HybridRetriever):
+        return retriever.search(query, k, vector)
+    return dense_search(retriever.vectorstore, query, k, vector)
+
+
+class TwoStageRetriever(BaseRetriever):
+    """Fetches ``fetch_k`` candidates, reranks them with FlashRank and keeps the best ``top_n``.
+
+    With a latency budget, the candidate count shrinks when reranking gets slow
+    (e.g. under load), based on a moving average of rerank time per candidate.
+    """
+
+    first_stage: BaseRetriever
+    reranker: FlashrankRerank
+    fetch_k: int = 20
+    top_n: int = 5
+    score_threshold: float = 0.0
+    latency_budget_ms: Optional[float] = None
+    rerank_ms_per_candidate: float = 0.0
+
+    def _candidate_count(self) -> int:
+        if not self.latency_budget_ms or not self.rerank_ms_per_candidate:
+            return self.fetch_k
+        affordable = int(self.latency_budget_ms / self.rerank_ms_per_candidate)
+        return max(self.top_n, min(self.fetch_k, affordable))
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        started = time.perf_counter()
+        candidates = fetch_candidates(self.first_stage, query, self._candidate_count())
+        fetched = time.perf_counter()
+        if not candidates:
+            return []
+
+        passages = [{"id": i, "text": doc.page_content} for i, doc in enumerate(candidates)]
+        results = self.reranker.client.rerank(RerankRequest(query=query, passages=passages))
+        reranked = time.perf_counter()
+
+        documents = []
+        for result in results[: self.top_n]:
+            if result["score"] < self.score_threshold:
+                break
+            doc = candidates[result["id"]]
+            documents.append(
+                Document(page_content=doc.page_content, metadata={**doc.metadata, "relevance_score": float(result["score"])})
+            )
+
+        metrics.rerank_seconds.observe(reranked - fetched)
+        rerank_ms = (reranked - fetched) * 1000
+        self.rerank_ms_per_candidate = (
+            0.8 * self.rerank_ms_per_candidate + 0.2 * rerank_ms / len(candidates)
+            if self.rerank_ms_per_candidate else rerank_ms / len(candidates)
+        )
+        logging.info(
+            "Retrieval timings: fetch=%.1fms (%d candidates), rerank=%.1fms, kept %d.",
+            (fetched - started) * 1000, len(candidates), rerank_ms, len(documents),
+        )
+        return documents
+
+class OffloadedRetriever(BaseRetriever):
+    """Async-native wrapper that runs a blocking retriever on the bounded retrieval executor."""
+
+    retriever: BaseRetriever
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return await run_off_loop(self.retriever.invoke, query)
+
+def create_first_stage(vector_store: VectorStore, database_dir: Path) -> BaseRetriever:
+    """Dense or hybrid candidate retriever, sized for the reranker when one is used."""
+    k = Config.Retriever.FETCH_K if Config.Retriever.USE_RERANKER else Config.Retriever.TOP_N
+    if Config.Retriever.SEARCH_TYPE == "hybrid":
+        return HybridRetriever(
+            vector_store=vector_store,
+            sparse_index=BM25Index.for_directory(getattr(vector_store, "path", database_dir)),
+            k=k,
+            fetch_k=Config.Retriever.HYBRID_FETCH_K,
+            rrf_k=Config.Retriever.RRF_K,
+        )
+    return vector_store.as_retriever(
+        search_type="similarity", search_kwargs={"k": k, "search_params": search_params()}
+    )
+
+def create_retriever(
+    llm: BaseLanguageModel,
+    vector_store: Optional[VectorStore] = None,
+    persist_directory: Optional[str] = None,
+) -> VectorStoreRetriever:
     logging.info("Starting retriever creation")
 
     try:
+        database_dir = resolve_database_dir(persist_directory)
         if not vector_store:
             logging.info("No vector store provided; creating a new one.")
-            vector_store = Qdrant.from_existing_collection(
-                embedding=create_embeddings(),
-                collection_name=Config.Database.DOCUMENTS_COLLECTION,
-                path=Config.Path.DATABASE_DIR,
-            )
+            vector_store = PooledQdrant(database_dir, embeddings=create_embeddings())
             logging.info("Vector store created successfully.")
 
         logging.info("Creating base retriever.")
-        retriever = vector_store.as_retriever(
-            search_type="similarity", search_kwargs={"k": 5}
-        )
+        retriever = create_first_stage(vector_store, database_dir)
         logging.info("Base retriever created.")
 
         if Config.Retriever.USE_RERANKER:
             logging.info("Using reranker to enhance retriever.")
-            retriever = ContextualCompressionRetriever(
-                base_compressor=create_reranker(), base_retriever=retriever
+            retriever = TwoStageRetriever(
+                first_stage=retriever,
+                reranker=create_reranker(),
+                fetch_k=Config.Retriever.FETCH_K,
+                top_n=Config.Retriever.TOP_N,
+                score_threshold=Config.Retriever.RERANK_SCORE_THRESHOLD,
+                latency_budget_ms=Config.Retriever.LATENCY_BUDGET_MS,
             )
             logging.info("Reranker applied successfully.")
 
@@ -43,6 +213,13 @@ def create_retriever(llm: BaseLanguageModel, vector_store: Optional[VectorStore]
             )
             logging.info("Chain filter applied successfully.")
 
+        if Config.RetrievalCache.ENABLED:
+            store_dir = Path(getattr(vector_store, "path", database_dir)).resolve()
+            retriever = CachedRetriever(retriever=retriever, database_dir=str(store_dir))
+            logging.info("Retrieval cache applied successfully.")
+
+        retriever = OffloadedRetriever(retriever=retriever)
+
         logging.info("Retriever creation completed.")
         return retriever
 
@@ -1,8 +1,159 @@
-from langchain_community.chat_message_histories import ChatMessageHistory
+import atexit
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import List, Sequence
 
-store = {}
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
 
-def get_session_history(session_id: str) -> ChatMessageHistory:
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
\ No newline at end of file
+from src.config import Config
+from logger.logging import logging
+
+
+def _message_tokens(message: BaseMessage) -> int:
+    return len(str(message.content)) // Config.Context.CHARS_PER_TOKEN + 1
+
+
+class WindowedChatMessageHistory(BaseChatMessageHistory):
+    """Chat history whose ``messages`` is the recent window sent with each prompt.
+
+    Only the tail of the conversation is kept in memory; every message is also
+    queued for the SQLite store, which holds the full transcript.
+    """
+
+    def __init__(self, session_id: str, session_store: "SessionHistoryStore", messages: Sequence[BaseMessage]):
+        self.session_id = session_id
+        self.session_store = session_store
+        self.lock = threading.RLock()
+        self._recent = deque(messages, maxlen=Config.History.IN_MEMORY_MESSAGES)
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        with self.lock:
+            window = list(self._recent)[-Config.CONVERSATION_MESSAGES_LIMIT:]
+        tokens, start = 0, len(window)
+        while start > 0 and tokens + _message_tokens(window[start - 1]) <= Config.History.TOKEN_LIMIT:
+            start -= 1
+            tokens += _message_tokens(window[start])
+        return window[start:]
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with self.lock:
+            self._recent.extend(messages)
+            self.session_store.enqueue(self.session_id, messages)
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.add_messages([message])
+
+    def clear(self) -> None:
+        with self.lock:
+            self._recent.clear()
+            self.session_store.delete(self.session_id)
+
+
+class SessionHistoryStore:
+    """LRU of in-memory session histories backed by SQLite with batched writes."""
+
+    def __init__(self, db_path: Path, max_sessions: int, batch_size: int, flush_interval: float):
+        self.db_path = Path(db_path)
+        self.max_sessions = max_sessions
+        self.batch_size = batch_size
+        self._sessions: "OrderedDict[str, WindowedChatMessageHistory]" = OrderedDict()
+        self._pending: List[tuple] = []
+        self._lock = threading.RLock()
+        self._db_lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS messages
+                              (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                               session_id TEXT NOT NULL,
+                               message TEXT NOT NULL,
+                               created REAL NOT NULL)''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)")
+        self._conn.commit()
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, args=(flush_interval,), name="session-history-flush", daemon=True
+        )
+        self._flusher.start()
+
+    def get(self, session_id: str) -> WindowedChatMessageHistory:
+        with self._lock:
+            history = self._sessions.pop(session_id, None)
+            if history is None:
+                history = WindowedChatMessageHistory(session_id, self, self._load(session_id))
+            self._sessions[session_id] = history
+            while len(self._sessions) > self.max_sessions:
+                # Evicted sessions reload their window from SQLite on next use.
+                evicted, _ = self._sessions.popitem(last=False)
+                logging.info("Evicted idle session %s from memory.", evicted)
+        return history
+
+    def _load(self, session_id: str) -> List[BaseMessage]:
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT message FROM messages WHERE session_id=? ORDER BY id DESC LIMIT ?",
+                (session_id, Config.History.IN_MEMORY_MESSAGES),
+            ).fetchall()
+        return messages_from_dict([json.loads(row[0]) for row in reversed(rows)])
+
+    def enqueue(self, session_id: str, messages: Sequence[BaseMessage]) -> None:
+        now = time.time()
+        with self._lock:
+            self._pending.extend(
+                (session_id, json.dumps(message_to_dict(message)), now) for message in messages
+            )
+            should_flush = len(self._pending) >= self.batch_size
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        with self._db_lock:
+            self._conn.executemany(
+                "INSERT INTO messages (session_id, message, created) VALUES (?, ?, ?)", pending
+            )
+            self._conn.commit()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._pending = [row for row in self._pending if row[0] != session_id]
+        with self._db_lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id=?", (session_id,))
+            self._conn.commit()
+
+    def _flush_periodically(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error("Error flushing session history: %s", e)
+
+    def close(self) -> None:
+        self._stop.set()
+        self.flush()
+
+
+store = SessionHistoryStore(
+    db_path=Config.Path.SESSION_HISTORY_DB,
+    max_sessions=Config.History.MAX_SESSIONS,
+    batch_size=Config.History.WRITE_BATCH_SIZE,
+    flush_interval=Config.History.FLUSH_INTERVAL_SECONDS,
+)
+# Write out messages still waiting for the next batch when the process shuts down.
+atexit.register(store.close)
+
+def get_session_history(session_id: str) -> WindowedChatMessageHistory:
+    return store.get(session_id)
@@ -0,0 +1,192 @@
+import json
+import math
+import re
+import sqlite3
+import threading
+import weakref
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from langchain_core.documents import Document
+
+from src.config import Config
+from logger.logging import logging
+
+# Keeps part numbers, clause IDs and versions ("AB-1234", "4.2.1") whole and also indexes their parts.
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+
+# Dropped from queries only: they match most chunks but add almost nothing to the score.
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into is it its "
+    "me my no not of on or our so than that the their them then there these they this to "
+    "was we were what when where which who why will with would you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = re.split(r"[-./]", token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part)
+    return tokens
+
+
+class BM25Index:
+    """SQLite inverted index stored next to a Qdrant collection and keyed by the same point IDs."""
+
+    # The most recently used indexes stay open; older ones are dropped from the LRU and
+    # close once no retriever or ingest holds them, which _live tracks without keeping alive.
+    _instances: "OrderedDict[str, BM25Index]" = OrderedDict()
+    _live: "weakref.WeakValueDictionary[str, BM25Index]" = weakref.WeakValueDictionary()
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_path: Path, k1: float = None, b: float = None):
+        self.db_path = Path(db_path)
+        self.k1 = k1 or Config.Retriever.BM25_K1
+        self.b = b or Config.Retriever.BM25_B
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS chunks
+                              (point_id TEXT PRIMARY KEY,
+                               doc_hash TEXT NOT NULL,
+                               length INTEGER NOT NULL,
+                               page_content TEXT NOT NULL,
+                               metadata TEXT NOT NULL)''')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS postings
+                              (term TEXT NOT NULL,
+                               point_id TEXT NOT NULL,
+                               tf INTEGER NOT NULL,
+                               PRIMARY KEY (term, point_id)) WITHOUT ROWID''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_doc_hash ON chunks (doc_hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_point_id ON postings (point_id)")
+        self._conn.commit()
+
+    @classmethod
+    def for_directory(cls, database_dir: Path) -> "BM25Index":
+        db_path = (Path(database_dir) / Config.Database.SPARSE_INDEX_FILE).resolve()
+        key = str(db_path)
+        with cls._instances_lock:
+            index = cls._instances.pop(key, None) or cls._live.get(key)
+            if index is None:
+                index = cls._live[key] = cls(db_path)
+            cls._instances[key] = index
+            while len(cls._instances) > Config.Database.MAX_OPEN_CLIENTS:
+                cls._instances.popitem(last=False)
+            return index
+
+    def add(self, point_ids: List[str], documents: List[Document], doc_hash: str) -> None:
+        with self._lock:
+            for point_id, document in zip(point_ids, documents):
+                counts = Counter(tokenize(document.page_content))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)",
+                    (point_id, doc_hash, sum(counts.values()), document.page_content,
+                     json.dumps(document.metadata)),
+                )
+                self._conn.execute("DELETE FROM postings WHERE point_id=?", (point_id,))
+                self._conn.executemany(
+                    "INSERT INTO postings VALUES (?, ?, ?)",
+                    [(term, point_id, tf) for term, tf in counts.items()],
+                )
+            self._conn.commit()
+
+    def delete_document(self, doc_hash: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM postings WHERE point_id IN (SELECT point_id FROM chunks WHERE doc_hash=?)",
+                (doc_hash,),
+            )
+            self._conn.execute("DELETE FROM chunks WHERE doc_hash=?", (doc_hash,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+
+    def sample_chunks(self, limit: int, shuffle: bool = False) -> List[str]:
+        """Text of up to ``limit`` indexed chunks, in point ID order or at random."""
+        order = "RANDOM()" if shuffle else "point_id"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT page_content FROM chunks ORDER BY {order} LIMIT ?", (limit,)
+            ).fetchall()
+        return [content for (content,) in rows]
+
+    def _document_frequencies(self, terms: List[str], total: int) -> Dict[str, int]:
+        """Document frequency of each term, leaving out terms found in too many chunks.
+
+        Counting stops just past the cutoff, so a very common term costs a bounded read.
+        The rarest term is kept if every one is over the cutoff, so the query still matches.
+        """
+        cutoff = max(int(total * Config.Retriever.BM25_MAX_DF_RATIO), 1)
+        frequencies, common = {}, {}
+        for term in terms:
+            (df,) = self._conn.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM postings WHERE term=? LIMIT ?)", (term, cutoff + 1)
+            ).fetchone()
+            if df > cutoff:
+                common[term] = df
+            elif df:
+                frequencies[term] = df
+        if not frequencies and common:
+            term = min(common, key=common.get)
+            (frequencies[term],) = self._conn.execute(
+                "SELECT COUNT(*) FROM postings WHERE term=?", (term,)
+            ).fetchone()
+        return frequencies
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        tokens = set(tokenize(query))
+        terms = list(tokens - STOPWORDS or tokens)
+        if not terms:
+            return []
+
+        with self._lock:
+            total, avg_length = self._conn.execute("SELECT COUNT(*), AVG(length) FROM chunks").fetchone()
+            if not total:
+                return []
+            document_frequency = self._document_frequencies(terms, total)
+            if not document_frequency:
+                return []
+            terms = list(document_frequency)
+            placeholders = ",".join("?" * len(terms))
+            rows = self._conn.execute(
+                f'''SELECT p.point_id, p.term, p.tf, c.length FROM postings p
+                    JOIN chunks c ON c.point_id = p.point_id
+                    WHERE p.term IN ({placeholders})''',
+                terms,
+            ).fetchall()
+
+            scores = Counter()
+            for point_id, term, tf, length in rows:
+                df = document_frequency[term]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                norm = tf + self.k1 * (1 - self.b + self.b * length / (avg_length or 1))
+                scores[point_id] += idf * tf * (self.k1 + 1) / norm
+
+            top = scores.most_common(k)
+            if not top:
+                return []
+            found = {
+                point_id: (content, metadata)
+                for point_id, content, metadata in self._conn.execute(
+                    f"SELECT point_id, page_content, metadata FROM chunks WHERE point_id IN ({','.join('?' * len(top))})",
+                    [point_id for point_id, _ in top],
+                ).fetchall()
+            }
+
+        results = []
+        for point_id, score in top:
+            content, metadata = found[point_id]
+            metadata = {**json.loads(metadata), "_id": point_id}
+            results.append((Document(page_content=content, metadata=metadata), score))
+        logging.info("BM25 search matched %d chunks for %d query terms.", len(scores), len(terms))
+        return results
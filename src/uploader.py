@@ -1,54 +1,55 @@
+import hashlib
 import shutil
 from pathlib import Path
 from typing import List
-import fitz  # PyMuPDF
 
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 
 from src.config import Config
+from src.parser import ExtractedDocument
 
 from logger.logging import logging
 
-class InvalidPDFException(Exception):
-    pass
-
-def is_pdf_with_text(file_path: Path) -> bool:
-    """Check if a PDF file contains any text."""
-    with fitz.open(file_path) as doc:
-        for page in doc:
-            text = page.get_text()
-            if text.strip():  # Check if there's any non-empty text
-                return True
-    return False
-
-def upload_files(files: List[UploadedFile], remove_old_files: bool = True) -> List[Path]:
+def save_upload(file: UploadedFile, file_path: Path) -> str:
+    """Stream an upload to disk in blocks and return the sha256 of its contents."""
+    digest = hashlib.sha256()
+    file.seek(0)
+    with file_path.open("wb") as f:
+        for block in iter(lambda: file.read(Config.Ingestion.UPLOAD_BLOCK_SIZE), b""):
+            digest.update(block)
+            f.write(block)
+    return digest.hexdigest()
+
+def stage_files(files: List[UploadedFile], remove_old_files: bool = True, documents_dir: Path = None) -> List[ExtractedDocument]:
+    """Save uploads to the staging directory, hashing them on the way; pages are not extracted yet."""
+    documents_dir = documents_dir or Config.Path.DOCUMENTS_DIR
+    # The vector store is kept and updated incrementally by the ingestor;
+    # only the staged copies of previous uploads are cleared.
     if remove_old_files:
-        shutil.rmtree(Config.Path.DATABASE_DIR, ignore_errors=True)
-        shutil.rmtree(Config.Path.DOCUMENTS_DIR, ignore_errors=True)
+        shutil.rmtree(documents_dir, ignore_errors=True)
     
-    Config.Path.DOCUMENTS_DIR.mkdir(parents=True, exist_ok=True)
-    file_paths = []
+    documents_dir.mkdir(parents=True, exist_ok=True)
+    saved = []
 
     for file in files:
         try:
             if not file.name.lower().endswith('.pdf'):
                 raise ValueError(f"File '{file.name}' is not a PDF.")
             
-            file_path = Config.Path.DOCUMENTS_DIR / file.name
-            with file_path.open("wb") as f:
-                f.write(file.getvalue())
-
-            if not is_pdf_with_text(file_path):
-                raise InvalidPDFException(f"The PDF '{file.name}' does not contain any text.")
-
-            file_paths.append(file_path)
+            # Only the base name is kept, so a crafted name cannot write outside the staging directory.
+            file_path = documents_dir / Path(file.name).name
+            saved.append(ExtractedDocument(path=file_path, doc_hash=save_upload(file, file_path)))
 
-        except (ValueError, InvalidPDFException) as e:
+        except ValueError as e:
             # Handle specific exceptions
-            logging.error(f"Error processing file '{file.name}': {e}")
+            logging.error("Error processing file '%s': %s", file.name, e)
 
         except Exception as e:
             # Handle any other unexpected exceptions
-            logging.exception(f"An unexpected error occurred with file '{file.name}': {e}")
-    
-    return file_paths
+            logging.exception("An unexpected error occurred with file '%s': %s", file.name, e)
+
+    return saved
+
+def upload_files(files: List[UploadedFile], remove_old_files: bool = True, documents_dir: Path = None) -> List[ExtractedDocument]:
+    """Stage uploads for ingest, which checks each PDF for text while it streams the pages."""
+    return stage_files(files, remove_old_files=remove_old_files, documents_dir=documents_dir)
@@ -0,0 +1,169 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple, Union
+
+from langchain_core.embeddings import Embeddings
+from langchain_qdrant import Qdrant
+from qdrant_client import QdrantClient, models
+from qdrant_client.local.qdrant_local import QdrantLocal
+
+from src.config import Config
+from logger.logging import logging
+
+
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+USER_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def quantization_config(mode: Optional[str] = None) -> Optional[models.QuantizationConfig]:
+    mode = mode or Config.Database.QUANTIZATION
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode {mode!r}; expected one of {QUANTIZATION_MODES}.")
+    if mode == "scalar":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=Config.Database.QUANTIZATION_QUANTILE,
+            always_ram=Config.Database.QUANTIZATION_ALWAYS_RAM,
+        ))
+    if mode == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(
+            always_ram=Config.Database.QUANTIZATION_ALWAYS_RAM,
+        ))
+    return None
+
+
+def is_local(client: QdrantClient) -> bool:
+    """Whether the client embeds Qdrant in-process; only a server applies quantization."""
+    return isinstance(getattr(client, "_client", None), QdrantLocal)
+
+
+def search_params() -> Optional[models.SearchParams]:
+    """Search quantized vectors, then rescore the oversampled candidates with the originals."""
+    if Config.Database.QUANTIZATION == "none":
+        return None
+    return models.SearchParams(quantization=models.QuantizationSearchParams(
+        rescore=True, oversampling=Config.Database.RESCORE_OVERSAMPLING,
+    ))
+
+
+class QdrantClientPool:
+    """Bounded LRU of open local Qdrant clients, one per storage path.
+
+    A local Qdrant path can only be opened by one client at a time, so every
+    reader and writer in the process goes through this pool. Clients idle for
+    longer than ``idle_seconds`` or pushed out by ``max_clients`` are closed and
+    reopened on next use, unless they are checked out with ``checkout()``; the
+    pool may go over ``max_clients`` while that many are in use.
+    """
+
+    def __init__(self, max_clients: int, idle_seconds: float):
+        self.max_clients = max_clients
+        self.idle_seconds = idle_seconds
+        # path -> [client, last used, checkouts]
+        self._clients: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _acquire(self, path: Union[str, Path], pin: bool) -> Tuple[str, QdrantClient]:
+        key = str(Path(path).resolve())
+        with self._lock:
+            entry = self._clients.pop(key, None)
+            if entry is None:
+                Path(key).mkdir(parents=True, exist_ok=True)
+                entry = [QdrantClient(path=key), 0.0, 0]
+                logging.info("Opened Qdrant client for %s.", key)
+            entry[1] = time.monotonic()
+            entry[2] += pin
+            self._clients[key] = entry
+            self._close_unused(keep=key)
+            return key, entry[0]
+
+    def get(self, path: Union[str, Path]) -> QdrantClient:
+        """Client for a single short call; hold it across calls with ``checkout()`` instead."""
+        return self._acquire(path, pin=False)[1]
+
+    @contextmanager
+    def checkout(self, path: Union[str, Path]) -> Iterator[QdrantClient]:
+        """Client that the pool will not close until the block exits."""
+        key, client = self._acquire(path, pin=True)
+        try:
+            yield client
+        finally:
+            with self._lock:
+                entry = self._clients[key]
+                entry[1] = time.monotonic()
+                entry[2] -= 1
+
+    def close_all(self) -> None:
+        with self._lock:
+            while self._clients:
+                self._close(*self._clients.popitem(last=False))
+
+    def _close_unused(self, keep: str) -> None:
+        # Oldest first: close idle clients and, while over the limit, the least recently used.
+        now = time.monotonic()
+        for key in list(self._clients):
+            _, used, checkouts = self._clients[key]
+            if checkouts or key == keep:
+                continue
+            if len(self._clients) > self.max_clients or now - used > self.idle_seconds:
+                self._close(key, self._clients.pop(key))
+
+    @staticmethod
+    def _close(key: str, entry: list) -> None:
+        try:
+            entry[0].close()
+            logging.info("Closed Qdrant client for %s.", key)
+        except Exception as e:
+            logging.error("Error closing Qdrant client for %s: %s", key, e)
+
+
+client_pool = QdrantClientPool(
+    max_clients=Config.Database.MAX_OPEN_CLIENTS,
+    idle_seconds=Config.Database.CLIENT_IDLE_SECONDS,
+)
+
+
+def checked_user_id(user_id) -> str:
+    """Return ``user_id`` as a string that is safe to use as a path component."""
+    user_id = str(user_id)
+    if not USER_ID_PATTERN.fullmatch(user_id):
+        raise ValueError(f"Invalid user id {user_id!r}.")
+    return user_id
+
+
+def user_store_dir(user_id) -> Path:
+    return Config.Path.VECTOR_STORES_DIR / f"user_{checked_user_id(user_id)}"
+
+
+def user_documents_dir(user_id) -> Path:
+    return Config.Path.DOCUMENTS_DIR / f"user_{checked_user_id(user_id)}"
+
+
+def resolve_database_dir(persist_directory: Optional[Union[str, Path]] = None) -> Path:
+    return Path(persist_directory) if persist_directory else Config.Path.DATABASE_DIR
+
+
+class PooledQdrant(Qdrant):
+    """Qdrant vector store that borrows its client from the pool on every access."""
+
+    def __init__(self, path: Union[str, Path], embeddings: Embeddings,
+                 collection_name: str = Config.Database.DOCUMENTS_COLLECTION):
+        self.path = Path(path)
+        super().__init__(
+            client=client_pool.get(self.path),
+            collection_name=collection_name,
+            embeddings=embeddings,
+        )
+
+    @property
+    def client(self) -> QdrantClient:
+        return client_pool.get(self.path)
+
+    @client.setter
+    def client(self, value: QdrantClient) -> None:
+        # The pool owns the client; Qdrant.__init__ assigns it once and that is ignored.
+        pass
@@ -0,0 +1,34 @@
+from langchain_core.documents import Document
+
+from src.chain import pack_context
+
+
+def _chunk(text: str, chunk_index: int, start_index: int) -> Document:
+    return Document(
+        page_content=text,
+        metadata={"doc_hash": "doc", "chunk_index": chunk_index, "start_index": start_index},
+    )
+
+
+def test_adjacent_chunks_drop_splitter_overlap():
+    documents = [
+        _chunk("Open the inlet valves slowly.", 0, 0),
+        _chunk("valves slowly. Then check the gauge.", 1, 15),
+    ]
+
+    assert pack_context(documents, token_budget=1000).text == (
+        "Open the inlet valves slowly. Then check the gauge.\n----"
+    )
+
+
+def test_chunks_from_different_groups_keep_chance_matches():
+    # The second chunk starts a new semantic group, so its offset restarts at 0.
+    documents = [
+        _chunk("Tighten to a torque 1", 0, 40),
+        _chunk("12 Nm and close the valves", 1, 0),
+        _chunk("slowly before restarting.", 2, 0),
+    ]
+
+    assert pack_context(documents, token_budget=1000).text == (
+        "Tighten to a torque 1 12 Nm and close the valves slowly before restarting.\n----"
+    )